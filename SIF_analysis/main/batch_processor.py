@@ -0,0 +1,103 @@
+import os
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sif_analysis import merge_files, process_all, PLOT_FORMATS
+
+# 1 つの base_path について生成される成果物（グラフは拡張子なし）
+OUTPUT_FILES = ["merged_data.csv", "max_K.csv", "min_K.csv", "a_c_vs_a_t_data.csv"]
+GRAPH_FILES = ["max_K_graph", "min_K_graph", "a_c_vs_a_t_graph"]
+
+def expand_base_paths(patterns):
+    """パス・glob パターンを展開し、step*_-1sec フォルダを含むディレクトリを重複なく返す"""
+    base_paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        for path in matches:
+            path = os.path.abspath(path)
+            if path in base_paths or not os.path.isdir(path):
+                continue
+            if glob.glob(os.path.join(glob.escape(path), "step*_-1sec")):
+                base_paths.append(path)
+            else:
+                print(f"step*_-1sec フォルダが無いためスキップします: {path}")
+    return base_paths
+
+def process_run(base_path, chunk_size, diff_threshold, plate_thickness, merge_workers=1, incremental=False,
+                plot_format="svg"):
+    """1 つの base_path について merge と max_K / min_K / a/c vs a/t を実行する（ワーカー内で実行）
+
+    plot_format=None ならグラフを作らず CSV だけを出力する。
+    """
+    started = time.perf_counter()
+    result = {"base_path": base_path}
+    try:
+        merge_files(base_path, None, merge_workers, incremental=incremental)
+        process_all(base_path, chunk_size, diff_threshold, plate_thickness, plot_format=plot_format)
+        result["status"] = "ok"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    output_files = OUTPUT_FILES + ([f"{name}.{plot_format}" for name in GRAPH_FILES] if plot_format else [])
+    result["outputs"] = [name for name in output_files if os.path.exists(os.path.join(base_path, name))]
+    return result
+
+def run_batch(patterns, chunk_size, diff_threshold, plate_thickness, workers=None, merge_workers=1,
+              incremental=False, summary_file="batch_summary.json", plot_format="svg"):
+    """複数の base_path をプロセスプールで並列に処理し、結果の一覧を summary_file に書き出す"""
+    base_paths = expand_base_paths(patterns)
+    if not base_paths:
+        print("処理対象のフォルダが見つかりませんでした。")
+        return None
+
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(process_run, base_path, chunk_size, diff_threshold, plate_thickness,
+                                   merge_workers, incremental, plot_format)
+                   for base_path in base_paths]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"[{len(results)}/{len(base_paths)}] {result['status']:5s} {result['seconds']:8.2f} s  {result['base_path']}")
+
+    results.sort(key=lambda result: base_paths.index(result["base_path"]))
+    summary = {
+        "parameters": {
+            "chunk_size": chunk_size,
+            "diff_threshold": diff_threshold,
+            "plate_thickness": plate_thickness,
+            "plot_format": plot_format,
+        },
+        "total_seconds": round(time.perf_counter() - started, 3),
+        "succeeded": sum(result["status"] == "ok" for result in results),
+        "failed": sum(result["status"] != "ok" for result in results),
+        "runs": results,
+    }
+    with open(summary_file, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    print(f"成功 {summary['succeeded']} 件 / 失敗 {summary['failed']} 件 ({summary['total_seconds']:.2f} s)")
+    print(f"バッチ処理の結果を保存しました: {summary_file}")
+    return summary
+
+# メイン処理
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run merge, max_K, min_K and a/c vs a/t for many base paths in parallel.")
+    parser.add_argument("base_paths", nargs="+", help="Base directory paths or glob patterns (e.g. \"runs/*\")")
+    parser.add_argument("--chunk_size", type=int, required=False, help="Rows per step (default: step table recorded by merge)")
+    parser.add_argument("--diff_threshold", type=float, required=True, help="Threshold for 3rd column difference (for max_K)")
+    parser.add_argument("--plate_thickness", type=float, required=True, help="Plate thickness value (for min_K and a/c vs a/t)")
+    parser.add_argument("--workers", type=int, required=False, help="Number of runs processed in parallel (default: CPU count)")
+    parser.add_argument("--merge_workers", type=int, default=1, help="Parallel readers inside each merge")
+    parser.add_argument("--incremental", action="store_true", help="Only read step files that are new or changed since the last merge")
+    parser.add_argument("--summary", default="batch_summary.json", help="Path of the summary manifest (JSON)")
+    parser.add_argument("--plot_format", choices=PLOT_FORMATS, default="svg", help="Graph file format")
+    parser.add_argument("--no_plot", action="store_true", help="Only write the CSV outputs")
+    args = parser.parse_args()
+
+    run_batch(args.base_paths, args.chunk_size, args.diff_threshold, args.plate_thickness,
+              args.workers, args.merge_workers, args.incremental, args.summary,
+              None if args.no_plot else args.plot_format)
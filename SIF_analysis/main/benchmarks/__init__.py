@@ -0,0 +1 @@
+"""SIF 解析ツールのベンチマーク（合成データの生成と各処理の計測）"""
@@ -0,0 +1,57 @@
+"""ステップ CSV の読み込み速度を比較するベンチマーク
+
+合成したステップフォルダに対して、型推定ありの pd.read_csv（従来の読み込み）と
+read_numeric_csv（pyarrow / NumPy、列の絞り込みあり・なし）の読み込み時間を比べる。
+
+    python benchmarks/bench_csv_reader.py --steps 200 --nodes 2000
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import write_step_folders
+from sif_analysis import STEP_HEADER_ROWS, read_numeric_csv
+from sif_analysis.readers import _default_csv_engine, _list_step_files
+
+def time_reader(label, read, step_files, repeat):
+    """全ステップファイルを read で読む時間を repeat 回測り、最短時間を表示する"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = sum(len(read(file_path)) for file_path in step_files)
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:32s} {best:8.3f} s  {rows / best:12,.0f} rows/s")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare step CSV readers on synthetic step folders.")
+    parser.add_argument("--steps", type=int, default=200, help="Number of step folders")
+    parser.add_argument("--nodes", type=int, default=2000, help="Rows per step file")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per reader (best time is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as base_path:
+        write_step_folders(base_path, args.steps, args.nodes)
+        step_files = _list_step_files(base_path, None)
+        print(f"{len(step_files)} ファイル × {args.nodes} 行")
+
+        baseline = time_reader(
+            "pd.read_csv (型推定)",
+            lambda file_path: pd.read_csv(file_path, skiprows=STEP_HEADER_ROWS, header=None).to_numpy(dtype=float),
+            step_files, args.repeat)
+        engines = ["numpy"] + (["pyarrow"] if _default_csv_engine() == "pyarrow" else [])
+        for engine in engines:
+            for usecols in (None, [2, 3, 5]):
+                label = f"read_numeric_csv {engine}" + (" 列 2,3,5" if usecols else "")
+                elapsed = time_reader(
+                    label,
+                    lambda file_path: read_numeric_csv(file_path, STEP_HEADER_ROWS, usecols, engine),
+                    step_files, args.repeat)
+                print(f"{'':32s} 従来比 {baseline / elapsed:5.2f} 倍")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""き裂半幅と SIF の組（max_K_half_width）の一致確認とベンチマーク
+
+以前の各ツールにあった 2 行ずつのループ（loop_half_width）と max_K_half_width が
+乱数の max_K データ（NaN・同値・奇数行を含む）で完全に同じ値を返すことを確かめてから、
+両者の処理時間を比べる。一致しなければ AssertionError で終了する。
+
+    python benchmarks/bench_half_width.py --rows 200000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sif_analysis import max_K_half_width
+
+def loop_half_width(data):
+    """以前の実装（DataFrame を 2 行ずつ iloc で読むループ）"""
+    max_k_data = pd.DataFrame(data).iloc[:-2]
+    x = []
+    y = []
+    for i in range(0, len(max_k_data), 2):
+        if i + 1 >= len(max_k_data):
+            break
+        row1 = max_k_data.iloc[i]
+        row2 = max_k_data.iloc[i + 1]
+        diff_half = abs(row1[2] - row2[2]) / 2
+        x.append(diff_half)
+        y.append(row1[5] if row1[2] < row2[2] else row2[5])
+    return x, y
+
+def random_max_K(rng, n_rows):
+    """3列目に同値・NaN を含む 6列の max_K データ"""
+    data = rng.normal(size=(n_rows, 6))
+    data[:, 2] = np.round(data[:, 2], 1)
+    data[rng.random(n_rows) < 0.05, 2] = np.nan
+    data[rng.random(n_rows) < 0.05, 5] = np.nan
+    return data
+
+def check_equal(rng, trials):
+    """行数を変えた乱数データで、ループと max_K_half_width の結果を比べる"""
+    for trial in range(trials):
+        data = random_max_K(rng, int(rng.integers(0, 40)))
+        expected_x, expected_y = loop_half_width(data)
+        x, y = max_K_half_width(data)
+        assert np.array_equal(x, np.asarray(expected_x, dtype=float), equal_nan=True), trial
+        assert np.array_equal(y, np.asarray(expected_y, dtype=float), equal_nan=True), trial
+    print(f"{trials} 通りのデータでループと一致しました。")
+
+def main():
+    parser = argparse.ArgumentParser(description="Check max_K_half_width against the old pair loop and time both.")
+    parser.add_argument("--rows", type=int, default=200_000, help="Rows of the timed max_K data")
+    parser.add_argument("--trials", type=int, default=500, help="Random data sets for the equality check")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    check_equal(rng, args.trials)
+
+    data = random_max_K(rng, args.rows)
+    started = time.perf_counter()
+    expected = loop_half_width(data)
+    loop_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    result = max_K_half_width(data)
+    vector_seconds = max(time.perf_counter() - started, 1e-9)
+    assert np.array_equal(result[0], expected[0], equal_nan=True)
+    assert np.array_equal(result[1], expected[1], equal_nan=True)
+    print(f"{'ループ (iloc)':24s} {loop_seconds:8.3f} s")
+    print(f"{'max_K_half_width':24s} {vector_seconds:8.3f} s  従来比 {loop_seconds / vector_seconds:,.0f} 倍")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""SIF 解析の各処理（merge・max_K・min_K・a/c vs a/t）の時間・ピークメモリ・処理量を測る
+
+合成した半楕円き裂のステップフォルダを一時ディレクトリに作り、各処理を順に実行する。
+ピークメモリは tracemalloc で追跡できる Python・NumPy の確保量（pyarrow 内部の確保は含まない）。
+tracemalloc を有効にすると処理が大幅に遅くなるため、時間とメモリは別々の実行で測る。
+
+    python benchmarks/bench_pipeline.py --steps 500 --nodes 2001 --json bench.json
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import write_step_folders
+from sif_analysis import DEFAULT_BLOCK_ROWS, PLOT_FORMATS, merge_files, process_max_K, process_min_K, process_a_c_vs_a_t, process_all
+
+def measure(name, func, n_rows, n_steps, track_memory=True):
+    """func を実行して経過時間・CPU 時間・処理量を測り、track_memory なら再度実行してピークメモリを測る"""
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    func()
+    cpu_seconds = time.process_time() - cpu_started
+    seconds = time.perf_counter() - started
+
+    peak_mb = None
+    if track_memory:
+        tracemalloc.start()
+        func()
+        peak_mb = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        tracemalloc.stop()
+    return {
+        "stage": name,
+        "seconds": round(seconds, 4),
+        "cpu_seconds": round(cpu_seconds, 4),
+        "peak_mb": peak_mb,
+        "rows_per_s": round(n_rows / seconds),
+        "steps_per_s": round(n_steps / seconds, 1),
+    }
+
+def check_a_c_vs_a_t(base_path, a, c, plate_thickness):
+    """a_c_vs_a_t_data.csv と合成データの a/t・a/c の最大誤差を返す（最後のステップは出力されない）"""
+    output = pd.read_csv(os.path.join(base_path, "a_c_vs_a_t_data.csv")).to_numpy()
+    expected = np.column_stack([a / plate_thickness, a / c])[:-1]
+    return float(np.abs(output - expected).max())
+
+def run(steps, nodes, files_per_step, plate_thickness, diff_threshold, workers=None,
+        out_of_core=False, block_rows=DEFAULT_BLOCK_ROWS, no_sidecar=False, track_memory=True, plot_format="svg"):
+    """合成データを作って各処理を計測し、結果の辞書を返す"""
+    with tempfile.TemporaryDirectory() as base_path:
+        a, c = write_step_folders(base_path, steps, nodes, files_per_step, plate_thickness)
+        n_rows = steps * nodes
+        results = [measure("merge", lambda: merge_files(base_path, None, workers), n_rows, steps, track_memory)]
+        if no_sidecar:
+            os.remove(os.path.join(base_path, "merged_data.npy"))
+
+        stages = [
+            ("max_K", lambda: process_max_K(base_path, None, diff_threshold, plate_thickness, out_of_core, block_rows,
+                                            plot_format=plot_format)),
+            ("min_K", lambda: process_min_K(base_path, None, plate_thickness, out_of_core, block_rows,
+                                            plot_format=plot_format)),
+            ("a_c_vs_a_t", lambda: process_a_c_vs_a_t(base_path, None, plate_thickness, out_of_core, block_rows,
+                                                      plot_format=plot_format)),
+            ("all", lambda: process_all(base_path, None, diff_threshold, plate_thickness,
+                                        out_of_core=out_of_core, block_rows=block_rows, plot_format=plot_format)),
+        ]
+        for name, stage in stages:
+            results.append(measure(name, stage, n_rows, steps, track_memory))
+        error = check_a_c_vs_a_t(base_path, a, c, plate_thickness)
+
+    return {
+        "parameters": {
+            "steps": steps, "nodes": nodes, "files_per_step": files_per_step,
+            "plate_thickness": plate_thickness, "diff_threshold": diff_threshold, "workers": workers,
+            "out_of_core": out_of_core, "block_rows": block_rows, "no_sidecar": no_sidecar,
+            "plot_format": plot_format,
+        },
+        "a_c_vs_a_t_max_error": error,
+        "stages": results,
+    }
+
+def print_report(report):
+    """計測結果を表形式で表示する"""
+    print(f"{'stage':12s} {'seconds':>9s} {'cpu s':>9s} {'peak MB':>9s} {'rows/s':>14s} {'steps/s':>10s}")
+    for result in report["stages"]:
+        peak = "-" if result["peak_mb"] is None else f"{result['peak_mb']:.1f}"
+        print(f"{result['stage']:12s} {result['seconds']:9.3f} {result['cpu_seconds']:9.3f} {peak:>9s} "
+              f"{result['rows_per_s']:14,d} {result['steps_per_s']:10,.1f}")
+    print(f"a/c vs a/t の合成データとの最大誤差: {report['a_c_vs_a_t_max_error']:.3g}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SIF pipeline stages on synthetic crack-front data.")
+    parser.add_argument("--steps", type=int, default=200, help="Number of step folders")
+    parser.add_argument("--nodes", type=int, default=2001, help="Crack-front nodes per step (odd includes the deepest point)")
+    parser.add_argument("--files_per_step", type=int, default=1, help="CSV files per step folder")
+    parser.add_argument("--plate_thickness", type=float, default=10.0, help="Plate thickness of the synthetic specimen")
+    parser.add_argument("--diff_threshold", type=float, default=0.5, help="Threshold for 3rd column difference (for max_K)")
+    parser.add_argument("--workers", type=int, required=False, help="Parallel readers for merge")
+    parser.add_argument("--out_of_core", action="store_true", help="Run max_K, min_K, a_c_vs_a_t and all in out-of-core mode")
+    parser.add_argument("--block_rows", type=int, default=DEFAULT_BLOCK_ROWS, help="Approximate rows per block (for --out_of_core)")
+    parser.add_argument("--no_sidecar", action="store_true", help="Delete merged_data.npy after merge so later stages parse the CSV")
+    parser.add_argument("--plot_format", choices=PLOT_FORMATS, default="svg", help="Graph file format")
+    parser.add_argument("--no_plot", action="store_true", help="Measure the numeric extraction only")
+    parser.add_argument("--no_memory", action="store_true", help="Skip the second run that measures peak memory")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = run(args.steps, args.nodes, args.files_per_step, args.plate_thickness, args.diff_threshold,
+                 args.workers, args.out_of_core, args.block_rows, args.no_sidecar, not args.no_memory,
+                 None if args.no_plot else args.plot_format)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"ベンチマーク結果を保存しました: {args.json}")
+
+if __name__ == "__main__":
+    main()
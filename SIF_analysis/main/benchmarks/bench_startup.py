@@ -0,0 +1,65 @@
+"""`python data_processor.py merge` の起動時間（コールドスタート）を測るベンチマーク
+
+小さな合成データに対して merge を別プロセスで repeat 回実行し、最短の経過時間を
+COLD_START_TARGET_S と比べる。merge で pandas・matplotlib・tkinter が読み込まれていないことも確認する。
+目標を超えた場合は終了コード 1 を返す。
+
+    python benchmarks/bench_startup.py
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import write_step_folders
+
+DATA_PROCESSOR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_processor.py")
+
+# 5 ステップ × 101 節点の merge を終えるまでの目標時間 [s]（インタプリタの起動を含む）
+COLD_START_TARGET_S = 0.6
+
+# merge で読み込まれてはいけないモジュール
+HEAVY_MODULES = ("pandas", "matplotlib", "tkinter")
+
+# data_processor.py を __main__ として実行し、読み込まれた重いモジュールを最後に表示する
+_RUN_AND_REPORT = (
+    "import runpy, sys\n"
+    "sys.argv = sys.argv[1:]\n"
+    "runpy.run_path(sys.argv[0], run_name='__main__')\n"
+    f"print('HEAVY:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+)
+
+def measure_cold_start(base_path, repeat):
+    """merge を repeat 回別プロセスで実行し、最短時間 [s] と読み込まれた重いモジュールを返す"""
+    command = [sys.executable, DATA_PROCESSOR, "merge", "--base_path", base_path]
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(command, check=True, capture_output=True)
+        best = min(best, time.perf_counter() - started)
+
+    output = subprocess.run([sys.executable, "-c", _RUN_AND_REPORT] + command[1:],
+                            check=True, capture_output=True, text=True).stdout
+    heavy = [line[len("HEAVY:"):] for line in output.splitlines() if line.startswith("HEAVY:")][-1]
+    return best, [name for name in heavy.split(",") if name]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold-start time of `python data_processor.py merge`.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs (best time is reported)")
+    parser.add_argument("--target", type=float, default=COLD_START_TARGET_S, help="Target time in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as base_path:
+        write_step_folders(base_path, 5, 101)
+        seconds, heavy = measure_cold_start(base_path, args.repeat)
+
+    print(f"python data_processor.py merge: {seconds:.3f} s（目標 {args.target:.2f} s）")
+    print(f"読み込まれた重いモジュール: {', '.join(heavy) or 'なし'}")
+    if seconds > args.target or heavy:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""半楕円き裂前縁の合成ステップデータを作る
+
+各ステップのき裂は深さ a・表面半長 c の半楕円で、前縁上の節点を角度 φ = 0〜π で等分する。
+列の並びは実際の出力と同じで、3列目が幅方向の座標 c·cosφ、4列目が板厚方向の座標
+plate_thickness - a·sinφ、6列目が Newman-Raju 型の近似式による SIF。
+"""
+import os
+import numpy as np
+
+# ステップ CSV の先頭 2 行（sif_analysis.STEP_HEADER_ROWS 行）
+HEADER = "Node,Time,X,Y,Z,K\n-,s,mm,mm,mm,MPa*m^1/2\n"
+
+def crack_sizes(steps, a0=1.0, c0=2.0, da=0.02, dc=0.03):
+    """各ステップのき裂深さ a と表面半長 c の配列を返す"""
+    step_index = np.arange(steps)
+    return a0 + da * step_index, c0 + dc * step_index
+
+def crack_front(a, c, nodes, plate_thickness, stress=100.0, time=0.0):
+    """1 ステップ分の前縁節点の値（nodes 行 6 列）を返す
+
+    nodes を奇数にすると φ = π/2 の最深点が節点に含まれる。
+    """
+    phi = np.linspace(0, np.pi, nodes)
+    ratio = a / c
+    shape_factor = 1 + 1.464 * ratio ** 1.65
+    sif = stress * np.sqrt(np.pi * a * 1e-3 / shape_factor) * (np.sin(phi) ** 2 + ratio ** 2 * np.cos(phi) ** 2) ** 0.25
+    return np.column_stack([
+        np.arange(1, nodes + 1),
+        np.full(nodes, time),
+        c * np.cos(phi),
+        plate_thickness - a * np.sin(phi),
+        np.zeros(nodes),
+        sif,
+    ])
+
+def write_step_folders(base_path, steps, nodes, files_per_step=1, plate_thickness=10.0, fmt="%.9g"):
+    """base_path に step{i}_-1sec フォルダを steps 個作り、前縁を files_per_step 個の CSV に分けて書く
+
+    戻り値は各ステップの (a, c) の配列で、a/t・a/c の期待値の計算に使える。
+    """
+    a, c = crack_sizes(steps)
+    for i in range(steps):
+        folder_path = os.path.join(base_path, f"step{i + 1}_-1sec")
+        os.makedirs(folder_path, exist_ok=True)
+        values = crack_front(a[i], c[i], nodes, plate_thickness, time=-1.0)
+        for j, part in enumerate(np.array_split(values, files_per_step)):
+            with open(os.path.join(folder_path, f"front{j + 1}.csv"), "w") as f:
+                f.write(HEADER)
+                np.savetxt(f, part, delimiter=",", fmt=fmt)
+    return a, c
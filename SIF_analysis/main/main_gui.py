@@ -1,145 +1,163 @@
+import os
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import os
-import pandas as pd
-import matplotlib.pyplot as plt
-
-
-# データ処理関数
-def merge_files(base_path, max_number):
-    """CSVファイルをフォルダごとにマージする処理"""
-    output_file = os.path.join(base_path, "merged_data.csv")
-    all_data = []
-
-    for i in range(1, max_number + 1):
-        folder_name = f"step{i}_-1sec"
-        folder_path = os.path.join(base_path, folder_name)
-        if not os.path.exists(folder_path):
-            print(f"フォルダが見つかりません: {folder_path}")
-            continue
-
-        for file_name in os.listdir(folder_path):
-            if file_name.endswith(".csv"):
-                file_path = os.path.join(folder_path, file_name)
-                try:
-                    df = pd.read_csv(file_path, skiprows=2, header=None)
-                    all_data.append(df)
-                    print(f"読み込み成功: {file_path}")
-                except Exception as e:
-                    print(f"エラー: {file_path}, {e}")
-
-    if all_data:
-        merged_df = pd.concat(all_data, ignore_index=True)
-        merged_df.to_csv(output_file, index=False, header=False)
-        print(f"マージが完了しました: {output_file}")
-    else:
-        print("データが見つかりませんでした。")
+import queue
+import threading
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+from sif_analysis import (merge_files, process_max_K, process_min_K, process_all, process_sweep, watch_once,
+                          Cancelled, StageProfiler, report_profile, PLOT_FORMATS, ResultCache, CACHE_DIR_NAME)
 
-def process_max_K(base_path, chunk_size, diff_threshold, plate_thickness):
-    """4列目の最大値処理とグラフ作成"""
-    input_file = os.path.join(base_path, "merged_data.csv")
-    output_csv = os.path.join(base_path, "max_K.csv")
-    output_svg = os.path.join(base_path, "max_K_graph.svg")
+# 監視モードのポーリング間隔 [ms]
+WATCH_INTERVAL_MS = 5000
+# 処理ログを output_log に反映する間隔 [ms]
+LOG_POLL_INTERVAL_MS = 100
 
-    data = pd.read_csv(input_file, header=None)
-    selected_rows = []
+# 処理はワーカースレッドで 1 件ずつ実行し、出力は log_queue 経由で画面に送る
+executor = ThreadPoolExecutor(max_workers=1)
+log_queue = queue.Queue()
+cancel_event = threading.Event()
+current_job = None
+current_mode = None
 
-    for start_row in range(0, len(data), chunk_size):
-        chunk = data.iloc[start_row:start_row + chunk_size]
-        if chunk.empty:
-            break
 
-        sorted_chunk = chunk.sort_values(by=3, ascending=False)
-        max_row = sorted_chunk.iloc[0]
-        max_row_3_value = max_row[2]
-
-        second_max_row = None
-        for _, row in sorted_chunk.iterrows():
-            if abs(row[2] - max_row_3_value) >= diff_threshold:
-                second_max_row = row
-                break
-
-        selected_rows.append(max_row.tolist())
-        if second_max_row is not None:
-            selected_rows.append(second_max_row.tolist())
-
-    result_df = pd.DataFrame(selected_rows)
-    result_df.to_csv(output_csv, index=False, header=False)
-    print(f"max_K.csv が生成されました: {output_csv}")
-
-    # グラフ作成
-    max_k_data = result_df.iloc[:-2]
-    x = []
-    y = []
-    for i in range(0, len(max_k_data), 2):
-        if i + 1 >= len(max_k_data):
-            break
-        row1 = max_k_data.iloc[i]
-        row2 = max_k_data.iloc[i + 1]
-        diff_half = abs(row1[2] - row2[2]) / 2
-        x.append(diff_half)
-        y.append(row1[5] if row1[2] < row2[2] else row2[5])
-
-    plt.figure(figsize=(8, 6))
-    plt.plot(x, y, marker='o', linestyle='-', color='blue')
-    plt.xlabel("Crack half-width [mm]", fontsize=12)
-    plt.ylabel("SIF [MPa*m^1/2]", fontsize=12)
-    plt.grid(True)
-    plt.xlim(left=0)
-    plt.ylim(bottom=0)
-    plt.tight_layout()
-    plt.savefig(output_svg, format='svg')
-    print(f"グラフがSVG形式で保存されました: {output_svg}")
-
-def process_min_K(base_path, chunk_size, plate_thickness):
-    """4列目の最小値処理とグラフ作成"""
-    input_file = os.path.join(base_path, "merged_data.csv")
-    output_csv = os.path.join(base_path, "min_K.csv")
-    output_svg = os.path.join(base_path, "min_K_graph.svg")
-
-    data = pd.read_csv(input_file, header=None)
-    selected_rows = []
-
-    for start_row in range(0, len(data), chunk_size):
-        chunk = data.iloc[start_row:start_row + chunk_size]
-        if chunk.empty:
-            break
+class QueueWriter:
+    """print の出力を log_queue に送る標準出力の代わり"""
 
-        sorted_chunk = chunk.sort_values(by=3, ascending=True)
-        min_row = sorted_chunk.iloc[0]
-        selected_rows.append(min_row.tolist())
+    def write(self, text):
+        if text:
+            log_queue.put(("log", text))
 
-    result_df = pd.DataFrame(selected_rows)
-    result_df.to_csv(output_csv, index=False, header=False)
-    print(f"min_K.csv が生成されました: {output_csv}")
+    def flush(self):
+        pass
 
-    # グラフ作成
-    result_df = result_df.iloc[:-1]
-    x = plate_thickness - result_df.iloc[:, 3]
-    y = result_df.iloc[:, 5]
 
-    plt.figure(figsize=(8, 6))
-    plt.plot(x, y, marker='o', linestyle='-', color='green')
-    plt.xlabel("Crack Depth [mm]", fontsize=12)
-    plt.ylabel("SIF [MPa*m^1/2]", fontsize=12)
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(output_svg, format='svg')
-    print(f"グラフがSVG形式で保存されました: {output_svg}")
+def log_progress(message):
+    """処理の進捗を 1 行ずつ log_queue に送る"""
+    log_queue.put(("log", message + "\n"))
 
-# GUIアプリケーション
-def run_script(mode, base_path, max_number=None, chunk_size=None, diff_threshold=None, plate_thickness=None):
-    """処理モードに応じた関数を実行"""
+def _run_job(mode, job, quiet=False):
+    """ワーカースレッドで job を実行し、結果を log_queue に送る"""
+    error_kind = "watch_error" if mode == "watch" else "error"
     try:
-        if mode == "merge":
-            merge_files(base_path, max_number)
-        elif mode == "max_K":
-            process_max_K(base_path, chunk_size, diff_threshold, plate_thickness)
-        elif mode == "min_K":
-            process_min_K(base_path, chunk_size, plate_thickness)
-        output_log.insert(tk.END, f"{mode} 処理が完了しました。\n")
+        with redirect_stdout(QueueWriter()):
+            job()
+        if not quiet:
+            log_queue.put(("log", f"{mode} 処理が完了しました。\n"))
+    except Cancelled:
+        log_queue.put(("log", f"{mode} 処理を中断しました。\n"))
     except Exception as e:
-        messagebox.showerror("エラー", f"処理中にエラーが発生しました:\n{str(e)}")
+        log_queue.put((error_kind, f"{mode} 処理中にエラーが発生しました:\n{str(e)}"))
+
+def submit_job(mode, job, quiet=False):
+    """実行中の処理が無ければ job をワーカースレッドに渡す"""
+    global current_job, current_mode
+    if current_job is not None and not current_job.done():
+        if not quiet:
+            messagebox.showwarning("実行中", "前の処理が終わってから実行してください。")
+        return False
+    cancel_event.clear()
+    if not quiet:
+        output_log.insert(tk.END, f"{mode} 処理を開始しました。\n")
+    current_mode = mode
+    current_job = executor.submit(_run_job, mode, job, quiet)
+    return True
+
+def cancel_job():
+    """実行中の処理に中断を要求する"""
+    if current_job is not None and not current_job.done():
+        cancel_event.set()
+        output_log.insert(tk.END, "中断を要求しました。\n")
+
+def poll_log():
+    """log_queue に溜まった出力を output_log に反映する"""
+    while True:
+        try:
+            kind, text = log_queue.get_nowait()
+        except queue.Empty:
+            break
+        if kind == "log":
+            output_log.insert(tk.END, text)
+        elif kind == "watch_error":
+            # 監視中のエラーはログに残すだけにして、次の周期で確認をやり直す
+            output_log.insert(tk.END, text + "\n（次の確認でやり直します）\n")
+        else:
+            output_log.insert(tk.END, text + "\n")
+            messagebox.showerror("エラー", text)
+        output_log.see(tk.END)
+    root.after(LOG_POLL_INTERVAL_MS, poll_log)
+
+# GUIアプリケーション
+def run_script(mode, base_path, max_number=None, chunk_size=None, diff_threshold=None, plate_thickness=None):
+    """処理モードに応じた関数をワーカースレッドで実行"""
+    profiler = StageProfiler() if profile_var.get() else None
+    plot_format = plot_format_var.get() if plot_var.get() else None
+    cache = ResultCache(os.path.join(base_path, CACHE_DIR_NAME)) if cache_var.get() else None
+    if mode == "merge":
+        incremental = incremental_var.get()
+        job = lambda: merge_files(base_path, max_number, incremental=incremental,
+                                  progress=log_progress, cancel_event=cancel_event, profiler=profiler)
+    elif mode == "max_K":
+        job = lambda: process_max_K(base_path, chunk_size, diff_threshold, plate_thickness, profiler=profiler,
+                                    plot_format=plot_format, cache=cache, progress=log_progress,
+                                    cancel_event=cancel_event)
+    elif mode == "min_K":
+        job = lambda: process_min_K(base_path, chunk_size, plate_thickness, profiler=profiler,
+                                    plot_format=plot_format, cache=cache, progress=log_progress,
+                                    cancel_event=cancel_event)
+    elif mode == "all":
+        job = lambda: process_all(base_path, chunk_size, diff_threshold, plate_thickness,
+                                  progress=log_progress, cancel_event=cancel_event, profiler=profiler,
+                                  plot_format=plot_format, cache=cache)
+    elif mode == "sweep":
+        # diff_threshold・plate_thickness にはカンマ区切りで並べた値のリストを渡す（板厚が空なら a/c vs a/t は出さない）
+        job = lambda: process_sweep(base_path, chunk_size, diff_threshold, plate_thickness,
+                                    progress=log_progress, cancel_event=cancel_event, profiler=profiler,
+                                    plot_format=plot_format)
+
+    if profiler is not None:
+        # 処理の後に段階ごとの計測結果を表示し、base_path に JSON で保存する
+        run = job
+
+        def job():
+            run()
+            report_profile(profiler, base_path, mode)
+    submit_job(mode, job)
+
+def toggle_watch():
+    """監視モードの開始・停止"""
+    global watch_job
+    if watch_job is not None:
+        root.after_cancel(watch_job)
+        watch_job = None
+    if watch_var.get():
+        watch_state.clear()
+        output_log.insert(tk.END, "監視を開始しました。\n")
+        poll_watch()
+    else:
+        if current_mode == "watch":
+            cancel_job()
+        output_log.insert(tk.END, "監視を停止しました。\n")
+
+def poll_watch():
+    """ステップフォルダの確認をワーカースレッドに渡す（前回の処理中なら次の周期に回す）"""
+    global watch_job
+    args = (base_path_entry.get(), int(chunk_size_spinbox.get()),
+            float(diff_threshold_spinbox.get()), int(plate_thickness_spinbox.get()))
+    plot_format = plot_format_var.get() if plot_var.get() else None
+
+    def job():
+        if watch_once(*args, watch_state, progress=log_progress, cancel_event=cancel_event, plot_format=plot_format):
+            log_progress("新しいステップを取り込み、結果を更新しました。")
+
+    submit_job("watch", job, quiet=True)
+    watch_job = root.after(WATCH_INTERVAL_MS, poll_watch)
+
+def on_close():
+    """実行中の処理に中断を要求してからウィンドウを閉じる"""
+    cancel_event.set()
+    executor.shutdown(wait=False)
+    root.destroy()
 
 def select_folder():
     """フォルダ選択ダイアログを表示"""
@@ -148,73 +166,118 @@ def select_folder():
         base_path_entry.delete(0, tk.END)
         base_path_entry.insert(0, folder_path)
 
-# メインウィンドウの作成
-root = tk.Tk()
-root.title("データ処理GUIアプリ")
-
-# フォルダのベースパス
-tk.Label(root, text="フォルダのベースパス:").grid(row=0, column=0, sticky=tk.W)
-base_path_entry = tk.Entry(root, width=50)
-base_path_entry.grid(row=0, column=1, padx=5, pady=5)
-tk.Button(root, text="参照", command=select_folder).grid(row=0, column=2, padx=5, pady=5)
-
-# 最大フォルダ番号
-tk.Label(root, text="最大フォルダ番号 (merge):").grid(row=1, column=0, sticky=tk.W)
-max_number_spinbox = tk.Spinbox(root, from_=1, to=100, width=10)
-max_number_spinbox.grid(row=1, column=1, padx=5, pady=5)
-
-# chunk_size
-tk.Label(root, text="chunk_size (max/min):").grid(row=2, column=0, sticky=tk.W)
-chunk_size_spinbox = tk.Spinbox(root, from_=1, to=1000, width=10)
-chunk_size_spinbox.grid(row=2, column=1, padx=5, pady=5)
-
-# 3列目の差の閾値
-tk.Label(root, text="3列目の差の閾値 (max):").grid(row=3, column=0, sticky=tk.W)
-diff_threshold_spinbox = tk.Spinbox(root, from_=0, to=100, increment=0.1, width=10)
-diff_threshold_spinbox.grid(row=3, column=1, padx=5, pady=5)
-
-# 板厚
-tk.Label(root, text="板厚 [mm] (min):").grid(row=4, column=0, sticky=tk.W)
-plate_thickness_spinbox = tk.Spinbox(root, from_=1, to=100, width=10)
-plate_thickness_spinbox.grid(row=4, column=1, padx=5, pady=5)
-
-# 実行ボタン
-tk.Button(root, text="merge 実行", command=lambda: run_script(
-    "merge",
-    base_path_entry.get(),
-    int(max_number_spinbox.get()),
-    None,  # chunk_sizeは不要
-    None,  # diff_thresholdは不要
-    None   # plate_thicknessは不要
-)).grid(row=5, column=0, padx=5, pady=5)
-
-tk.Button(root, text="max_K 実行", command=lambda: run_script(
-    "max_K",
-    base_path_entry.get(),
-    None,  # max_numberは不要
-    int(chunk_size_spinbox.get()),
-    float(diff_threshold_spinbox.get()),
-    int(plate_thickness_spinbox.get())
-)).grid(row=5, column=1, padx=5, pady=5)
-
-tk.Button(root, text="min_K 実行", command=lambda: run_script(
-    "min_K",
-    base_path_entry.get(),
-    None,  # max_numberは不要
-    int(chunk_size_spinbox.get()),
-    None,  # diff_thresholdは不要
-    int(plate_thickness_spinbox.get())
-)).grid(row=5, column=2, padx=5, pady=5)
-
-# 実行結果の表示
-output_log = tk.Text(root, height=10, width=80)
-output_log.grid(row=6, column=0, columnspan=3, padx=5, pady=5)
-
-# メインループ
-root.mainloop()
-
-
-
-
-
-
+# メインウィンドウの作成（merge のプロセスプールのワーカーが import したときは作らない）
+if __name__ == "__main__":
+    root = tk.Tk()
+    root.title("データ処理GUIアプリ")
+
+    # フォルダのベースパス
+    tk.Label(root, text="フォルダのベースパス:").grid(row=0, column=0, sticky=tk.W)
+    base_path_entry = tk.Entry(root, width=50)
+    base_path_entry.grid(row=0, column=1, padx=5, pady=5)
+    tk.Button(root, text="参照", command=select_folder).grid(row=0, column=2, padx=5, pady=5)
+
+    # 最大フォルダ番号
+    tk.Label(root, text="最大フォルダ番号 (merge):").grid(row=1, column=0, sticky=tk.W)
+    max_number_spinbox = tk.Spinbox(root, from_=1, to=100, width=10)
+    max_number_spinbox.grid(row=1, column=1, padx=5, pady=5)
+    incremental_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(root, text="追加ステップのみ", variable=incremental_var).grid(row=1, column=2, padx=5, pady=5)
+
+    # chunk_size
+    tk.Label(root, text="chunk_size (max/min, 0=ステップ自動):").grid(row=2, column=0, sticky=tk.W)
+    chunk_size_spinbox = tk.Spinbox(root, from_=0, to=1000, width=10)
+    chunk_size_spinbox.grid(row=2, column=1, padx=5, pady=5)
+
+    # グラフ出力の有無と形式（オフにすると CSV だけを出力する）
+    plot_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(root, text="グラフを出力", variable=plot_var).grid(row=2, column=2, padx=5, pady=5, sticky=tk.W)
+    plot_format_var = tk.StringVar(value=PLOT_FORMATS[0])
+    tk.OptionMenu(root, plot_format_var, *PLOT_FORMATS).grid(row=3, column=2, padx=5, pady=5, sticky=tk.W)
+    # 同じ入力・パラメータでの再実行は前回の出力を再利用する
+    cache_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(root, text="結果キャッシュを使う", variable=cache_var).grid(row=4, column=2, padx=5, pady=5, sticky=tk.W)
+
+    # 3列目の差の閾値
+    tk.Label(root, text="3列目の差の閾値 (max):").grid(row=3, column=0, sticky=tk.W)
+    diff_threshold_spinbox = tk.Spinbox(root, from_=0, to=100, increment=0.1, width=10)
+    diff_threshold_spinbox.grid(row=3, column=1, padx=5, pady=5)
+
+    # 板厚
+    tk.Label(root, text="板厚 [mm] (min):").grid(row=4, column=0, sticky=tk.W)
+    plate_thickness_spinbox = tk.Spinbox(root, from_=1, to=100, width=10)
+    plate_thickness_spinbox.grid(row=4, column=1, padx=5, pady=5)
+
+    # 実行ボタン
+    tk.Button(root, text="merge 実行", command=lambda: run_script(
+        "merge",
+        base_path_entry.get(),
+        int(max_number_spinbox.get()),
+        None,  # chunk_sizeは不要
+        None,  # diff_thresholdは不要
+        None   # plate_thicknessは不要
+    )).grid(row=5, column=0, padx=5, pady=5)
+
+    tk.Button(root, text="max_K 実行", command=lambda: run_script(
+        "max_K",
+        base_path_entry.get(),
+        None,  # max_numberは不要
+        int(chunk_size_spinbox.get()),
+        float(diff_threshold_spinbox.get()),
+        int(plate_thickness_spinbox.get())
+    )).grid(row=5, column=1, padx=5, pady=5)
+
+    tk.Button(root, text="min_K 実行", command=lambda: run_script(
+        "min_K",
+        base_path_entry.get(),
+        None,  # max_numberは不要
+        int(chunk_size_spinbox.get()),
+        None,  # diff_thresholdは不要
+        int(plate_thickness_spinbox.get())
+    )).grid(row=5, column=2, padx=5, pady=5)
+
+    tk.Button(root, text="全指標 実行 (max_K / min_K / a/c vs a/t)", command=lambda: run_script(
+        "all",
+        base_path_entry.get(),
+        None,  # max_numberは不要
+        int(chunk_size_spinbox.get()),
+        float(diff_threshold_spinbox.get()),
+        int(plate_thickness_spinbox.get())
+    )).grid(row=6, column=0, columnspan=3, padx=5, pady=5)
+
+    # 監視モード（新しい step フォルダが届くたびに merge と全指標を更新）
+    watch_var = tk.BooleanVar(value=False)
+    watch_state = {}
+    watch_job = None
+    tk.Checkbutton(root, text="監視モード (新しいステップを自動で処理)", variable=watch_var,
+                   command=toggle_watch).grid(row=7, column=0, columnspan=3, padx=5, pady=5)
+
+    # 実行結果の表示
+    output_log = tk.Text(root, height=10, width=80)
+    output_log.grid(row=8, column=0, columnspan=3, padx=5, pady=5)
+    profile_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(root, text="プロファイル (段階ごとの時間・メモリを記録)", variable=profile_var).grid(
+        row=9, column=0, columnspan=2, padx=5, pady=5, sticky=tk.W)
+    tk.Button(root, text="中断", command=cancel_job).grid(row=9, column=2, padx=5, pady=5, sticky=tk.E)
+
+    # スイープ（複数の diff_threshold の き裂半幅-SIF、複数の板厚の a/c vs a/t をそれぞれ 1 枚のグラフで比較）
+    tk.Label(root, text="スイープする閾値 (カンマ区切り):").grid(row=10, column=0, sticky=tk.W)
+    sweep_thresholds_entry = tk.Entry(root, width=50)
+    sweep_thresholds_entry.insert(0, "0.1, 0.2, 0.5, 1.0")
+    sweep_thresholds_entry.grid(row=10, column=1, padx=5, pady=5)
+    tk.Label(root, text="スイープする板厚 [mm] (カンマ区切り, 空欄=なし):").grid(row=11, column=0, sticky=tk.W)
+    sweep_thicknesses_entry = tk.Entry(root, width=50)
+    sweep_thicknesses_entry.grid(row=11, column=1, padx=5, pady=5)
+    tk.Button(root, text="スイープ 実行", command=lambda: run_script(
+        "sweep",
+        base_path_entry.get(),
+        None,  # max_numberは不要
+        int(chunk_size_spinbox.get()),
+        [float(value) for value in sweep_thresholds_entry.get().split(",") if value.strip()],
+        [float(value) for value in sweep_thicknesses_entry.get().split(",") if value.strip()]
+    )).grid(row=10, column=2, rowspan=2, padx=5, pady=5)
+
+    # メインループ
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    root.after(LOG_POLL_INTERVAL_MS, poll_log)
+    root.mainloop()
@@ -1,7 +1,6 @@
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
 from tkinter import Tk, Label, Entry, Button, filedialog, Listbox, colorchooser, messagebox
+from sif_analysis import compute_a_c_vs_a_t, max_K_half_width, plot_curves, resolve_step_offsets, specimen_store
 
 def select_folder(entry):
     """フォルダ選択ダイアログを表示してパスを設定する"""
@@ -20,6 +19,8 @@ def select_color(listbox, legend_colors, index):
 
 def load_csv_files(csv_folder, legend_colors, listbox):
     """CSVファイルを読み込んで凡例を表示"""
+    import matplotlib.pyplot as plt  # 起動を速くするため使う時に読み込む
+
     csv_files = [f for f in os.listdir(csv_folder) if f.startswith("merged_data-") and f.endswith(".csv")]
     if not csv_files:
         messagebox.showerror("エラー", "merged_data-*.csv ファイルが見つかりませんでした。")
@@ -37,6 +38,8 @@ def load_csv_files(csv_folder, legend_colors, listbox):
 def process_and_plot(csv_folder, chunk_size, plate_thickness, output_dir, legend_colors):
     """merged_data-*.csv, max_K-*.csv, min_K-*.csv を処理してグラフを作成。"""
     csv_files = [f for f in os.listdir(csv_folder) if f.endswith(".csv")]
+    # 2 回目以降は変更の無い CSV を読み直さず、バイナリをメモリマップで開く
+    store = specimen_store(csv_folder)
 
     if not csv_files:
         print("指定されたフォルダに CSV ファイルが見つかりませんでした。")
@@ -50,111 +53,72 @@ def process_and_plot(csv_folder, chunk_size, plate_thickness, output_dir, legend
 
     # min_K のグラフ描画
     if min_k_files:
-        plt.figure(figsize=(8, 6))
+        curves = {}
         for csv_file in min_k_files:
             file_path = os.path.join(csv_folder, csv_file)
             legend_name = csv_file.split("min_K-")[1].split(".csv")[0]
 
             # CSV読み込み
-            data = pd.read_csv(file_path, header=None).iloc[:-1]
-            x = plate_thickness - data.iloc[:, 3]
-            y = data.iloc[:, 5]
-
-            # 選択した色を使用
-            color = legend_colors.get(legend_name, "black")
-            print(f"min_K: 凡例名={legend_name}, 使用色={color}")  # デバッグ用
-            plt.plot(x, y, label=legend_name, color=color, marker='o')
-
-        plt.xlabel("Crack Depth [mm]", fontsize=12)
-        plt.ylabel("SIF [MPa*m^1/2]", fontsize=12)
-        plt.legend(title="Legend", fontsize=10)
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, "min_k_comparison.svg"), format="svg")
-        plt.close()
+            data = store.load(file_path)[:-1]
+            curves[legend_name] = (plate_thickness - data[:, 3], data[:, 5])
+            print(f"min_K: 凡例名={legend_name}, 使用色={legend_colors.get(legend_name, 'black')}")  # デバッグ用
+
+        plot_curves(os.path.join(output_dir, "min_k_comparison.svg"), curves, "Crack Depth [mm]", "SIF [MPa*m^1/2]",
+                    colors=_curve_colors(curves, legend_colors), legend_title="Legend")
         print("min_K グラフが保存されました。")
 
     # max_K のグラフ描画
     if max_k_files:
-        plt.figure(figsize=(8, 6))
+        curves = {}
         for csv_file in max_k_files:
             file_path = os.path.join(csv_folder, csv_file)
             legend_name = csv_file.split("max_K-")[1].split(".csv")[0]
 
             # CSV読み込み
-            data = pd.read_csv(file_path, header=None).iloc[:-2]
-            x = []
-            y = []
-            for j in range(0, len(data), 2):
-                if j + 1 >= len(data):
-                    break
-                row1 = data.iloc[j]
-                row2 = data.iloc[j + 1]
-                x.append(abs(row1[2] - row2[2]) / 2)
-                y.append(row1[5] if row1[2] < row2[2] else row2[5])
-
-            # 選択した色を使用
-            color = legend_colors.get(legend_name, "black")
-            print(f"max_K: 凡例名={legend_name}, 使用色={color}")  # デバッグ用
-            plt.plot(x, y, label=legend_name, color=color, marker='o')
-
-        plt.xlabel("Crack half-width [mm]", fontsize=12)
-        plt.ylabel("SIF [MPa*m^1/2]", fontsize=12)
-        plt.legend(title="Legend", fontsize=10)
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, "max_k_comparison.svg"), format="svg")
-        plt.close()
+            curves[legend_name] = max_K_half_width(store.load(file_path))
+            print(f"max_K: 凡例名={legend_name}, 使用色={legend_colors.get(legend_name, 'black')}")  # デバッグ用
+
+        plot_curves(os.path.join(output_dir, "max_k_comparison.svg"), curves, "Crack half-width [mm]",
+                    "SIF [MPa*m^1/2]", colors=_curve_colors(curves, legend_colors), legend_title="Legend")
         print("max_K グラフが保存されました。")
 
     # a_c_vs_a_t のグラフ描画
     if a_c_vs_a_t_files:
-        plt.figure(figsize=(8, 6))
+        curves = {}
         for csv_file in a_c_vs_a_t_files:
             file_path = os.path.join(csv_folder, csv_file)
             legend_name = csv_file.split("merged_data-")[1].split(".csv")[0]
 
-            data = pd.read_csv(file_path, header=None)
-            x = []
-            y = []
-
-            for start_row in range(0, len(data), chunk_size):
-                chunk = data.iloc[start_row:start_row + chunk_size]
-                if chunk.empty:
-                    break
-
-                max_col3 = chunk[2].max()
-                min_col3 = chunk[2].min()
-
-                if max_col3 == min_col3:
-                    continue
-
-                diff_half = (max_col3 - min_col3) / 2
-                min_col4 = chunk[3].min()
-                a_t = (plate_thickness - min_col4) / plate_thickness
-                a_c = (plate_thickness - min_col4) / diff_half
-
-                x.append(a_t)
-                y.append(a_c)
-
-            if len(x) > 1 and len(y) > 1:
+            values = store.load(file_path)
+            try:
+                offsets = resolve_step_offsets(file_path, len(values), chunk_size)
+            except ValueError as e:
+                # 名前を変えた CSV にはステップ表が無いので、同じフォルダの merged_data.csv のものを試す
+                try:
+                    offsets = resolve_step_offsets(os.path.join(csv_folder, "merged_data.csv"), len(values))
+                except ValueError:
+                    messagebox.showerror("エラー", f"{csv_file} のステップの区切りが分かりません。\n"
+                                                 f"チャンクサイズを入力してください。\n\n{e}")
+                    return
+            x, y = compute_a_c_vs_a_t(values[:, 2], values[:, 3], offsets, plate_thickness)
+
+            # 最後のプロットを省く
+            if len(x) > 1:
                 x = x[:-1]
                 y = y[:-1]
 
-            if x and y:
-                color = legend_colors.get(legend_name, "black")  # 選択した色を使用
-                print(f"a_c_vs_a_t: 凡例名={legend_name}, 使用色={color}")  # デバッグ用
-                plt.plot(x, y, label=legend_name, color=color, marker='o')
-
-        plt.xlabel("a/t", fontsize=12)
-        plt.ylabel("a/c", fontsize=12)
-        plt.legend(title="Legend", fontsize=10)
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, "a_c_vs_a_t_graph.svg"), format="svg")
-        plt.close()
+            if len(x):
+                curves[legend_name] = (x, y)
+                print(f"a_c_vs_a_t: 凡例名={legend_name}, 使用色={legend_colors.get(legend_name, 'black')}")  # デバッグ用
+
+        plot_curves(os.path.join(output_dir, "a_c_vs_a_t_graph.svg"), curves, "a/t", "a/c",
+                    colors=_curve_colors(curves, legend_colors), legend_title="Legend")
         print("a/c vs a/t グラフが保存されました。")
 
+def _curve_colors(curves, legend_colors):
+    """GUI で選んだ色（未設定の凡例は黒）"""
+    return {legend_name: legend_colors.get(legend_name, "black") for legend_name in curves}
+
 
 
 def main():
@@ -189,14 +153,14 @@ def main():
     thickness_entry.grid(row=3, column=1, padx=10, pady=10, sticky="w")
 
     # チャンクサイズ入力
-    Label(root, text="チャンクサイズ:").grid(row=4, column=0, padx=10, pady=10, sticky="w")
+    Label(root, text="チャンクサイズ (空欄=ステップ自動):").grid(row=4, column=0, padx=10, pady=10, sticky="w")
     chunk_size_entry = Entry(root, width=10)
     chunk_size_entry.grid(row=4, column=1, padx=10, pady=10, sticky="w")
 
     # 実行ボタン
     Button(root, text="グラフマージ", command=lambda: process_and_plot(
         csv_folder=folder_entry.get(),
-        chunk_size=int(chunk_size_entry.get()),
+        chunk_size=int(chunk_size_entry.get() or 0),
         plate_thickness=float(thickness_entry.get()),
         output_dir=folder_entry.get(),
         legend_colors=legend_colors
@@ -1,7 +1,6 @@
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
 from tkinter import Tk, Label, Entry, Button, filedialog, Listbox, StringVar, colorchooser, messagebox
+from sif_analysis import max_K_half_width, plot_curves, specimen_store
 
 def select_folder(entry):
     """フォルダ選択ダイアログを表示してパスを設定する"""
@@ -20,6 +19,8 @@ def select_color(listbox, legend_colors, index):
 
 def load_csv_files(csv_folder, legend_colors, listbox):
     """CSVファイルを読み込んで凡例を表示"""
+    import matplotlib.pyplot as plt  # 起動を速くするため使う時に読み込む
+
     csv_files = [f for f in os.listdir(csv_folder) if f.endswith(".csv") and (f.startswith("min_K-") or f.startswith("max_K-"))]
     if not csv_files:
         messagebox.showerror("エラー", "CSVファイルが見つかりませんでした。")
@@ -37,6 +38,8 @@ def load_csv_files(csv_folder, legend_colors, listbox):
 def process_and_plot(csv_folder, plate_thickness, output_dir, legend_colors):
     """グラフを描画して保存する"""
     csv_files = [f for f in os.listdir(csv_folder) if f.endswith(".csv")]
+    # 2 回目以降は変更の無い CSV を読み直さず、バイナリをメモリマップで開く
+    store = specimen_store(csv_folder)
 
     if not csv_files:
         print("指定されたフォルダに CSV ファイルが見つかりませんでした。")
@@ -48,55 +51,33 @@ def process_and_plot(csv_folder, plate_thickness, output_dir, legend_colors):
 
     # min_K のグラフ描画
     if min_k_files:
-        plt.figure(figsize=(8, 6))
+        curves = {}
         for csv_file in min_k_files:
             file_path = os.path.join(csv_folder, csv_file)
             legend_name = csv_file.split("min_K-")[1].split(".csv")[0]
 
             # CSV読み込み
-            data = pd.read_csv(file_path, header=None).iloc[:-1]
-            x = plate_thickness - data.iloc[:, 3]
-            y = data.iloc[:, 5]
-
-            plt.plot(x, y, label=legend_name, color=legend_colors.get(legend_name, "black"), marker='o')
-
-        plt.xlabel("Crack Depth [mm]", fontsize=12)
-        plt.ylabel("SIF [MPa*m^1/2]", fontsize=12)
-        plt.legend(title="Legend", fontsize=10)
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, "min_k_comparison.svg"), format="svg")
-        plt.close()
+            data = store.load(file_path)[:-1]
+            curves[legend_name] = (plate_thickness - data[:, 3], data[:, 5])
+
+        colors = {legend_name: legend_colors.get(legend_name, "black") for legend_name in curves}
+        plot_curves(os.path.join(output_dir, "min_k_comparison.svg"), curves, "Crack Depth [mm]", "SIF [MPa*m^1/2]",
+                    colors=colors, legend_title="Legend")
         print("min_K グラフが保存されました。")
 
     # max_K のグラフ描画
     if max_k_files:
-        plt.figure(figsize=(8, 6))
+        curves = {}
         for csv_file in max_k_files:
             file_path = os.path.join(csv_folder, csv_file)
             legend_name = csv_file.split("max_K-")[1].split(".csv")[0]
 
             # CSV読み込み
-            data = pd.read_csv(file_path, header=None).iloc[:-2]
-            x = []
-            y = []
-            for j in range(0, len(data), 2):
-                if j + 1 >= len(data):
-                    break
-                row1 = data.iloc[j]
-                row2 = data.iloc[j + 1]
-                x.append(abs(row1[2] - row2[2]) / 2)
-                y.append(row1[5] if row1[2] < row2[2] else row2[5])
-
-            plt.plot(x, y, label=legend_name, color=legend_colors.get(legend_name, "black"), marker='o')
-
-        plt.xlabel("Crack half-width [mm]", fontsize=12)
-        plt.ylabel("SIF [MPa*m^1/2]", fontsize=12)
-        plt.legend(title="Legend", fontsize=10)
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, "max_k_comparison.svg"), format="svg")
-        plt.close()
+            curves[legend_name] = max_K_half_width(store.load(file_path))
+
+        colors = {legend_name: legend_colors.get(legend_name, "black") for legend_name in curves}
+        plot_curves(os.path.join(output_dir, "max_k_comparison.svg"), curves, "Crack half-width [mm]",
+                    "SIF [MPa*m^1/2]", colors=colors, legend_title="Legend")
         print("max_K グラフが保存されました。")
 
 def main():
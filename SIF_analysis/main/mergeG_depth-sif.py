@@ -1,6 +1,5 @@
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
+from sif_analysis import plot_curves, specimen_store
 
 def plot_min_k_comparison(csv_folder, output_svg, plate_thickness):
     """
@@ -18,35 +17,24 @@ def plot_min_k_comparison(csv_folder, output_svg, plate_thickness):
         print("フォルダ内に min_K-*.csv ファイルが見つかりませんでした。")
         return
     
-    # グラフの準備
-    plt.figure(figsize=(8, 6))
-    colors = plt.cm.tab10.colors  # カラーマップ（最大10色）
+    # CSV はフォルダ内の .sif_store にバイナリで保持し、変更が無ければ読み直さない
+    store = specimen_store(csv_folder)
+    curves = {}
 
-    for i, csv_file in enumerate(csv_files):
+    for csv_file in csv_files:
         # ファイルパスと凡例名を取得
         file_path = os.path.join(csv_folder, csv_file)
         legend_name = csv_file.split("min_K-")[1].split(".csv")[0]  # "TypeA" などを取得
 
         # CSVファイルを読み込み
-        data = pd.read_csv(file_path, header=None)
-        data = data.iloc[:-1]  # 最後の行を無視
+        data = store.load(file_path)
+        data = data[:-1]  # 最後の行を無視
 
         # 横軸と縦軸のデータを準備
-        x = plate_thickness - data.iloc[:, 3]
-        y = data.iloc[:, 5]
+        curves[legend_name] = (plate_thickness - data[:, 3], data[:, 5])
 
-        # グラフをプロット
-        plt.plot(x, y, label=legend_name, color=colors[i % len(colors)], marker='o')
-    
-    # グラフの詳細設定
-    plt.xlabel("Crack Depth [mm]", fontsize=12)
-    plt.ylabel("SIF [MPa*m^1/2]", fontsize=12)
-    plt.grid(True)
-    plt.legend(title="Legend", fontsize=10)
-    plt.tight_layout()
-    
-    # グラフを保存
-    plt.savefig(output_svg, format="svg")
+    # グラフを保存（色は既定の tab10 の順）
+    plot_curves(output_svg, curves, "Crack Depth [mm]", "SIF [MPa*m^1/2]", legend_title="Legend")
     print(f"グラフが生成されました: {output_svg}")
 
 # 使用例
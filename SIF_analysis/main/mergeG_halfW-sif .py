@@ -1,6 +1,5 @@
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
+from sif_analysis import max_K_half_width, plot_curves, specimen_store
 
 def plot_max_k_multiple(csv_folder, output_svg):
     """
@@ -17,57 +16,24 @@ def plot_max_k_multiple(csv_folder, output_svg):
         print("フォルダ内に max_K-*.csv ファイルが見つかりませんでした。")
         return
 
-    # グラフの準備
-    plt.figure(figsize=(8, 6))
-    colors = plt.cm.tab10.colors  # カラーマップ（最大10色）
+    # CSV はフォルダ内の .sif_store にバイナリで保持し、変更が無ければ読み直さない
+    store = specimen_store(csv_folder)
+    curves = {}
 
-    for i, csv_file in enumerate(csv_files):
+    for csv_file in csv_files:
         # ファイルパスと凡例名を取得
         file_path = os.path.join(csv_folder, csv_file)
         legend_name = csv_file.split("max_K-")[1].split(".csv")[0]  # "TypeA" などを取得
 
         # CSVファイルを読み込み
-        data = pd.read_csv(file_path, header=None)
+        data = store.load(file_path)
 
-        # 最後の2行を無視
-        data = data.iloc[:-2]
+        # 2行ごとの組で、3列目の差の1/2（横軸）と3列目が小さい方の6列目（縦軸）を求める（最後の2行は無視）
+        curves[legend_name] = max_K_half_width(data)
 
-        # ペアごとに計算
-        x = []  # 横軸データ
-        y = []  # 縦軸データ
-
-        for j in range(0, len(data), 2):  # 2行ごとに処理
-            if j + 1 >= len(data):  # ペアが揃わない場合はスキップ
-                break
-
-            # 1行目と2行目を取得
-            row1 = data.iloc[j]
-            row2 = data.iloc[j + 1]
-
-            # 3列目が大きい方から小さい方を引いた値の1/2を計算
-            diff_half = abs(row1[2] - row2[2]) / 2
-            x.append(diff_half)  # 横軸に追加
-
-            # 3列目の値が小さい方の6列目を取得
-            if row1[2] < row2[2]:
-                y.append(row1[5])
-            else:
-                y.append(row2[5])
-
-        # グラフをプロット
-        plt.plot(x, y, marker='o', linestyle='-', color=colors[i % len(colors)], label=legend_name)
-    
-    # グラフの詳細設定
-    plt.xlabel("Crack half-width [mm]", fontsize=12)
-    plt.ylabel("SIF [MPa*m^1/2]", fontsize=12)
-    plt.grid(True)
-    plt.legend(title=" ", fontsize=10)
-    plt.tight_layout()
-
-    # グラフを保存
+    # グラフを保存（色は既定の tab10 の順）
     try:
-        plt.savefig(output_svg, format="svg")
-        plt.close()
+        plot_curves(output_svg, curves, "Crack half-width [mm]", "SIF [MPa*m^1/2]", legend_title=" ")
         print(f"グラフが正常に保存されました: {output_svg}")
     except Exception as e:
         print(f"グラフの保存中にエラーが発生しました: {e}")
@@ -0,0 +1,32 @@
+"""SIF 解析ツールの共通ライブラリ
+
+ステップ CSV のマージ、merged_data の読み込みとステップ表、max_K・min_K・a/c vs a/t の抽出、
+き裂半幅の組、グラフ出力をまとめた処理本体。data_processor.py（CLI）・各 GUI・比較ツールは
+すべてここの関数を呼ぶので、高速化はこのパッケージに入れれば全ツールに反映される。
+
+    from sif_analysis import merge_files, process_all
+    merge_files(base_path, None)
+    process_all(base_path, None, diff_threshold=1.0, plate_thickness=16)
+"""
+from .runtime import Cancelled, StageProfiler, report_profile
+from .readers import (DEFAULT_BLOCK_ROWS, STEP_HEADER_ROWS, load_step_index, read_merged_data, read_numeric_csv,
+                      resolve_step_offsets)
+from .merge import merge_files
+from .selection import compute_a_c_vs_a_t, max_K_half_width
+from .plotting import PLOT_FORMATS, plot_curves, plot_results
+from .cache import CACHE_DIR_NAME, DEFAULT_CACHE_MAX_BYTES, ResultCache
+from .store import SPECIMEN_STORE_DIR_NAME, SpecimenStore, specimen_store
+from .pipeline import (process_a_c_vs_a_t, process_all, process_max_K, process_min_K, process_sweep, watch,
+                       watch_once)
+
+__all__ = [
+    "Cancelled", "StageProfiler", "report_profile",
+    "DEFAULT_BLOCK_ROWS", "STEP_HEADER_ROWS", "load_step_index", "read_merged_data", "read_numeric_csv",
+    "resolve_step_offsets",
+    "merge_files",
+    "compute_a_c_vs_a_t", "max_K_half_width",
+    "PLOT_FORMATS", "plot_curves", "plot_results",
+    "CACHE_DIR_NAME", "DEFAULT_CACHE_MAX_BYTES", "ResultCache",
+    "SPECIMEN_STORE_DIR_NAME", "SpecimenStore", "specimen_store",
+    "process_a_c_vs_a_t", "process_all", "process_max_K", "process_min_K", "process_sweep", "watch", "watch_once",
+]
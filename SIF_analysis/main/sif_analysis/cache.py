@@ -0,0 +1,137 @@
+"""merged_data.csv とパラメータが同じ場合に出力を再利用する結果キャッシュ"""
+import os
+import json
+import shutil
+import hashlib
+from .readers import load_step_index
+
+# 結果キャッシュの既定の置き場所（base_path からの相対パス）と容量の上限
+CACHE_DIR_NAME = ".sif_cache"
+
+DEFAULT_CACHE_MAX_BYTES = 200 * 2**20
+
+class ResultCache:
+    """merged_data.csv の内容とパラメータが同じなら、前回の出力ファイルを再利用するキャッシュ
+
+    キーは merged_data.csv のサイズと SHA-256（ステップ表で区切る場合はステップ表も）と
+    指標・パラメータから作る。ハッシュはサイズと更新時刻が変わらない限り記録した値を使う。
+    出力ファイルは cache_dir/<キー>/ にコピーして保存し、合計が max_bytes を超えたら
+    最後に使われたのが古いものから削除する。
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _fingerprint(self, csv_path):
+        """CSV のサイズ・更新時刻・SHA-256（サイズと更新時刻が記録と同じならハッシュは再計算しない）"""
+        stat = os.stat(csv_path)
+        memo_path = os.path.join(self.cache_dir, "fingerprints.json")
+        try:
+            with open(memo_path, encoding="utf-8") as f:
+                memo = json.load(f)
+        except (OSError, ValueError):
+            memo = {}
+        csv_key = os.path.abspath(csv_path)
+        known = memo.get(csv_key)
+        if known is not None and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known
+
+        digest = hashlib.sha256()
+        with open(csv_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 24), b""):
+                digest.update(block)
+        memo[csv_key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(memo_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(memo, f, ensure_ascii=False, indent=1)
+        os.replace(memo_path + ".tmp", memo_path)
+        return memo[csv_key]
+
+    def key(self, csv_path, metric, params):
+        """入力ファイル・指標・パラメータからキャッシュのキーを作る"""
+        fingerprint = self._fingerprint(csv_path)
+        material = {"metric": metric, "size": fingerprint["size"], "sha256": fingerprint["sha256"], "params": params}
+        if not params.get("chunk_size"):
+            # ステップ表で区切る場合は、区切りが変わったら別の結果になる
+            step_index = load_step_index(csv_path)
+            material["steps"] = None if step_index is None else step_index[1].tolist()
+        return hashlib.sha256(json.dumps(material, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+    def restore(self, key, base_path, file_names):
+        """キャッシュに file_names がすべてあれば base_path にコピーして True を返す"""
+        entry_dir = os.path.join(self.cache_dir, key)
+        if not all(os.path.exists(os.path.join(entry_dir, name)) for name in file_names):
+            return False
+        for name in file_names:
+            shutil.copyfile(os.path.join(entry_dir, name), os.path.join(base_path, name))
+        os.utime(entry_dir)
+        return True
+
+    def store(self, key, base_path, file_names):
+        """base_path の file_names をキャッシュに保存し、容量の上限を超えた分を削除する"""
+        entry_dir = os.path.join(self.cache_dir, key)
+        os.makedirs(entry_dir, exist_ok=True)
+        for name in file_names:
+            shutil.copyfile(os.path.join(base_path, name), os.path.join(entry_dir, name))
+        os.utime(entry_dir)
+        self._evict(keep=key)
+
+    def _evict(self, keep):
+        """合計サイズが max_bytes 以下になるまで、最後に使われたのが古いエントリから削除する"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if os.path.isdir(entry_dir):
+                size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+                entries.append((os.path.getmtime(entry_dir), name, size))
+        total = sum(size for _, _, size in entries)
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+            total -= size
+
+def _output_files(metric, plot_format):
+    """指標ごとの出力ファイル名"""
+    csv_name = "a_c_vs_a_t_data.csv" if metric == "a_c_vs_a_t" else f"{metric}.csv"
+    graph_names = [f"{metric}_graph.{plot_format}"] if plot_format is not None else []
+    return [csv_name] + graph_names
+
+def _cache_params(metric, chunk_size, diff_threshold, plate_thickness, plot_format, out_of_core):
+    """指標の結果に影響するパラメータだけを取り出す（読み込み方の違う結果は別に保存する）"""
+    params = {"chunk_size": chunk_size or None, "plot_format": plot_format, "out_of_core": bool(out_of_core)}
+    if metric == "max_K":
+        params["diff_threshold"] = diff_threshold
+    else:
+        params["plate_thickness"] = plate_thickness
+    return params
+
+def _restore_cached(cache, base_path, metrics, chunk_size, diff_threshold, plate_thickness, plot_format,
+                    out_of_core=False):
+    """キャッシュから復元できた指標を除いた metrics と、各指標のキャッシュキーを返す"""
+    if cache is None:
+        return list(metrics), {}
+    input_file = os.path.join(base_path, "merged_data.csv")
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"{input_file} が存在しません。")
+    missing = []
+    keys = {}
+    for metric in metrics:
+        keys[metric] = cache.key(input_file, metric,
+                                 _cache_params(metric, chunk_size, diff_threshold, plate_thickness, plot_format,
+                                               out_of_core))
+        if cache.restore(keys[metric], base_path, _output_files(metric, plot_format)):
+            print(f"{metric}: 入力とパラメータが前回と同じため、キャッシュの結果を使用しました。")
+        else:
+            missing.append(metric)
+    return missing, keys
+
+def _store_cached(cache, base_path, metrics, keys, plot_format):
+    """計算した指標の出力をキャッシュに保存する"""
+    if cache is None:
+        return
+    for metric in metrics:
+        cache.store(keys[metric], base_path, _output_files(metric, plot_format))
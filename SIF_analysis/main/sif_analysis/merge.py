@@ -0,0 +1,180 @@
+"""ステップフォルダの CSV を 1 つの merged_data.csv（と .npy サイドカー）にまとめる"""
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from itertools import islice
+from .runtime import _check_cancel, _profile_stage
+from .readers import (_list_step_files, _load_manifest, _manifest_path, _NPY_HEADER_SIZE, _read_step_file,
+                      _save_manifest, _sidecar_path, _write_npy_header)
+
+def merge_files(base_path, max_number, workers=None, use_processes=None, incremental=False,
+                progress=None, cancel_event=None, profiler=None):
+    """CSVファイルをフォルダごとにマージする処理
+
+    ステップファイルはプロセスプール（use_processes=False ならスレッドプール）で
+    並列に読み込み、ステップ順に merged_data.csv へ逐次書き出す。ファイルごとの処理の大半は
+    GIL を持ったままの CSV テキストの整形なので、スレッドでは複数コアを使えない。
+    use_processes=None の場合は、読み込むファイルが 1 つだけか workers=1 のときだけスレッドにする
+    （workers は読み込むファイル数までに抑える）。
+    先読みは workers の 2 倍までに抑えるので、メモリ使用量はステップ数に依存しない。
+    同じデータを merged_data.npy（float64 の .npy）にも書き出し、後段の読み込みに使う。
+
+    書き込んだファイルのパス・サイズ・更新時刻は merged_data.manifest.json に記録する。
+    incremental=True の場合は記録と先頭から一致するファイルの結果をそのまま残し、
+    それ以降の新規・変更ファイルだけを読み込んで追記する。読み込みに失敗したファイル
+    （ヘッダだけ・書き込み途中など）は記録しないので、次回の差分マージでそこから読み直す。
+
+    progress を渡すと読み込み済みファイル数・行数・速度を文字列で通知する。
+    cancel_event（threading.Event）がセットされると Cancelled を送出して中断する。
+    profiler（StageProfiler）を渡すと、列挙・解析待ち・書き出し・後処理の段階ごとに計測する。
+    """
+    output_file = os.path.join(base_path, "merged_data.csv")
+    sidecar_file = _sidecar_path(output_file)
+    workers = workers or os.cpu_count() or 1
+
+    with _profile_stage(profiler, "merge/list"):
+        step_files = []
+        signatures = []
+        for file_path in _list_step_files(base_path, max_number):
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                # 列挙の後に消えた（ソルバーが一時ファイルの名前を変えた）ファイルは読まない
+                continue
+            step_files.append(file_path)
+            signatures.append((os.path.relpath(file_path, base_path), stat.st_size, stat.st_mtime_ns))
+
+    # 前回の記録と先頭から一致するファイル数を数える
+    manifest = _load_manifest(output_file) if incremental else None
+    keep = 0
+    if manifest is not None:
+        for entry, signature in zip(manifest["entries"], signatures):
+            if (entry["path"], entry["size"], entry["mtime_ns"]) != tuple(signature):
+                break
+            keep += 1
+        if keep == len(manifest["entries"]) == len(signatures):
+            print(f"新しいステップファイルはありません: {output_file}")
+            return
+
+    workers = max(1, min(workers, len(step_files) - keep))
+    if use_processes is None:
+        use_processes = workers > 1
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+
+    resume = keep > 0
+    entries = manifest["entries"][:keep] if resume else []
+    csv_end = entries[-1]["csv_end"] if resume else 0
+    n_rows = entries[-1]["rows_end"] if resume else 0
+    n_cols = manifest["n_cols"] if resume else None
+    sidecar_ok = manifest["sidecar"] if resume else True
+    csv_target = output_file if resume else output_file + ".tmp"
+    sidecar_target = sidecar_file if resume else sidecar_file + ".tmp"
+
+    written_count = 0
+    started = last_report = time.perf_counter()
+    start_rows = n_rows
+    try:
+        with ExitStack() as stack:
+            executor = stack.enter_context(executor_class(max_workers=workers))
+            if resume:
+                # 一致した範囲の末尾まで切り詰めてから追記する
+                f = stack.enter_context(open(csv_target, "r+b"))
+                f.truncate(csv_end)
+                f.seek(csv_end)
+            else:
+                f = stack.enter_context(open(csv_target, "wb"))
+            sf = None
+            if sidecar_ok:
+                sf = stack.enter_context(open(sidecar_target, "r+b" if resume else "wb"))
+                sidecar_end = _NPY_HEADER_SIZE + n_rows * (n_cols or 0) * 8
+                sf.truncate(sidecar_end)
+                sf.seek(sidecar_end)
+
+            remaining = iter(zip(step_files[keep:], signatures[keep:]))
+            pending = deque()
+            for file_path, signature in islice(remaining, workers * 2):
+                pending.append((file_path, signature, executor.submit(_read_step_file, file_path)))
+
+            while pending:
+                file_path, signature, future = pending.popleft()
+                try:
+                    with _profile_stage(profiler, "merge/parse (wait)"):
+                        text, values, file_rows = future.result()
+                    with _profile_stage(profiler, "merge/write"):
+                        data = text.encode("utf-8")
+                        f.write(data)
+                    csv_end += len(data)
+                    n_rows += file_rows
+                    written_count += 1
+                except Exception as e:
+                    print(f"エラー: {file_path}, {e}")
+                else:
+                    # 列数が揃わない・数値でないデータが来たらサイドカーは作らない
+                    if values is None or (n_cols is not None and values.shape[1] != n_cols):
+                        sidecar_ok = False
+                    if sidecar_ok:
+                        n_cols = values.shape[1]
+                        with _profile_stage(profiler, "merge/write"):
+                            sf.write(values.astype("<f8", copy=False).tobytes())
+                    # 読めたファイルだけを記録する（失敗したファイルは次回の差分マージで読み直す）
+                    entries.append({"path": signature[0], "size": signature[1], "mtime_ns": signature[2],
+                                    "csv_end": csv_end, "rows_end": n_rows})
+
+                now = time.perf_counter()
+                if progress is not None and (now - last_report >= 0.5 or not pending):
+                    last_report = now
+                    rows = n_rows - start_rows
+                    progress(f"読み込み {len(entries)}/{len(step_files)} ファイル, "
+                             f"{rows} 行 ({rows / max(now - started, 1e-9):,.0f} 行/s)")
+                if cancel_event is not None and cancel_event.is_set():
+                    for _, _, pending_future in pending:
+                        pending_future.cancel()
+                    _check_cancel(cancel_event)
+
+                # 書き出した分だけ次のファイルを投入する
+                for next_path, next_signature in islice(remaining, 1):
+                    pending.append((next_path, next_signature, executor.submit(_read_step_file, next_path)))
+
+            if sidecar_ok and n_cols is not None:
+                _write_npy_header(sf, n_rows, n_cols)
+    except BaseException:
+        if resume:
+            # 途中まで追記した状態なので、次回は全体をマージし直させる
+            if os.path.exists(_manifest_path(output_file)):
+                os.remove(_manifest_path(output_file))
+        else:
+            for path in (csv_target, sidecar_target):
+                if os.path.exists(path):
+                    os.remove(path)
+        raise
+
+    if not resume and not written_count:
+        os.remove(csv_target)
+        if os.path.exists(sidecar_target):
+            os.remove(sidecar_target)
+        print("データが見つかりませんでした。")
+        return
+
+    with _profile_stage(profiler, "merge/finalize"):
+        if not resume:
+            os.replace(csv_target, output_file)
+        if sidecar_ok and n_cols is not None:
+            if not resume:
+                os.replace(sidecar_target, sidecar_file)
+            # CSV より新しいことを保証して、読み込み側でサイドカーが選ばれるようにする
+            os.utime(sidecar_file)
+        else:
+            for path in (sidecar_target, sidecar_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            print("数値以外の列または列数の違いがあるため merged_data.npy は作成しませんでした。")
+        _save_manifest(output_file, {"n_cols": n_cols, "sidecar": sidecar_ok, "entries": entries})
+
+    if resume:
+        print(f"{keep} ファイルは前回の結果を再利用し、{written_count} ファイルを追記しました。")
+    failed_count = len(step_files) - keep - written_count
+    if failed_count:
+        print(f"{failed_count} ファイルは読み込めなかったため、次回の差分マージで読み直します。")
+    print(f"マージが完了しました: {output_file}")
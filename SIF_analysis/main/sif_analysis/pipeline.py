@@ -0,0 +1,330 @@
+"""merged_data.csv から max_K・min_K・a/c vs a/t・スイープを出力する処理と監視モード"""
+import os
+import time
+import threading
+import numpy as np
+from .runtime import _check_cancel, _profile_stage
+from .readers import (_count_csv_rows, DEFAULT_BLOCK_ROWS, _fetch_rows, _format_csv_text, _iter_step_blocks,
+                      _list_step_files, _load_manifest, read_merged_data, resolve_step_offsets, _sidecar_is_fresh, _sidecar_path)
+from .merge import merge_files
+from .selection import (compute_a_c_vs_a_t, max_K_half_width, _max_K_sweep_index, _select_max_K_rows,
+                        _select_max_K_rows_swept, _select_min_K_rows)
+from .plotting import _plot_a_c_vs_a_t, _plot_max_K, _plot_min_K, _plot_sweep
+from .cache import _restore_cached, _store_cached
+
+def _load_merged(base_path, chunk_size, profiler=None, stage_name="load"):
+    """merged_data.csv（新しいサイドカーがあれば merged_data.npy）を読み込む
+
+    float の 2次元配列とステップの区切り（resolve_step_offsets を参照）を返す。
+    """
+    input_file = os.path.join(base_path, "merged_data.csv")
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"{input_file} が存在しません。")
+    with _profile_stage(profiler, stage_name):
+        values = read_merged_data(input_file)
+        return values, resolve_step_offsets(input_file, len(values), chunk_size)
+
+def _save_max_K(base_path, selected_rows, profiler=None, plot_format="svg"):
+    """選択した行から max_K.csv と（plot_format が None でなければ）グラフを出力する"""
+    output_csv = os.path.join(base_path, "max_K.csv")
+    with _profile_stage(profiler, "max_K/write_csv"):
+        with open(output_csv, "w") as f:
+            f.write(_format_csv_text(np.asarray(selected_rows)))
+    print(f"max_K.csv が生成されました: {output_csv}")
+
+    if plot_format is not None:
+        with _profile_stage(profiler, "max_K/plot"):
+            _plot_max_K(base_path, selected_rows, plot_format)
+
+def _save_min_K(base_path, selected_rows, plate_thickness, profiler=None, plot_format="svg"):
+    """選択した行から min_K.csv と（plot_format が None でなければ）グラフを出力する"""
+    output_csv = os.path.join(base_path, "min_K.csv")
+    with _profile_stage(profiler, "min_K/write_csv"):
+        with open(output_csv, "w") as f:
+            f.write(_format_csv_text(np.asarray(selected_rows)))
+    print(f"min_K.csv が生成されました: {output_csv}")
+
+    if plot_format is not None:
+        with _profile_stage(profiler, "min_K/plot"):
+            _plot_min_K(base_path, selected_rows, plate_thickness, plot_format)
+
+def _save_a_c_vs_a_t(base_path, x, y, profiler=None, plot_format="svg"):
+    """a/t・a/c の配列から a_c_vs_a_t_data.csv と（plot_format が None でなければ）グラフを出力する
+
+    最後のプロットは CSV・グラフとも除外する。
+    """
+    output_csv = os.path.join(base_path, "a_c_vs_a_t_data.csv")
+
+    # 最後のプロットを省く
+    if len(x) > 1:
+        x = x[:-1]
+        y = y[:-1]
+        print("最後のプロットを除外しました。")
+
+    if plot_format is not None:
+        with _profile_stage(profiler, "a_c_vs_a_t/plot"):
+            _plot_a_c_vs_a_t(base_path, x, y, plot_format)
+
+    with _profile_stage(profiler, "a_c_vs_a_t/write_csv"):
+        with open(output_csv, "w") as f:
+            f.write("a/t,a/c\n")
+            f.write(_format_csv_text(np.column_stack([x, y])))
+    print(f"グラフデータがCSVファイルとして保存されました: {output_csv}")
+
+def _write_max_K(base_path, values, offsets, diff_threshold, profiler=None, plot_format="svg"):
+    """読み込み済みの配列から max_K.csv とグラフを出力する"""
+    with _profile_stage(profiler, "max_K/select"):
+        selected_rows = values[_select_max_K_rows(values[:, 2], values[:, 3], offsets, diff_threshold)]
+    _save_max_K(base_path, selected_rows, profiler, plot_format)
+
+def _write_min_K(base_path, values, offsets, plate_thickness, profiler=None, plot_format="svg"):
+    """読み込み済みの配列から min_K.csv とグラフを出力する"""
+    with _profile_stage(profiler, "min_K/select"):
+        selected_rows = values[_select_min_K_rows(values[:, 3], offsets)]
+    _save_min_K(base_path, selected_rows, plate_thickness, profiler, plot_format)
+
+def _write_a_c_vs_a_t(base_path, values, offsets, plate_thickness, profiler=None, plot_format="svg"):
+    """読み込み済みの配列から a_c_vs_a_t_data.csv とグラフを出力する"""
+    with _profile_stage(profiler, "a_c_vs_a_t/select"):
+        x, y = compute_a_c_vs_a_t(values[:, 2], values[:, 3], offsets, plate_thickness)
+    _save_a_c_vs_a_t(base_path, x, y, profiler, plot_format)
+
+def _save_sweep(base_path, name, header, curves, profiler=None, plot_format="svg", plot_labels=None):
+    """スイープの曲線 {値: (x, y)} を「値, x, y」の 1 つの表（{name}.csv）と重ね描きのグラフにする"""
+    output_csv = os.path.join(base_path, f"{name}.csv")
+    with _profile_stage(profiler, f"{name}/write_csv"):
+        with open(output_csv, "w") as f:
+            f.write(header + "\n")
+            for value, (x, y) in curves.items():
+                x = np.asarray(x, dtype=float)
+                f.write(_format_csv_text(np.column_stack([np.full(len(x), value), x, np.asarray(y, dtype=float)])))
+    print(f"スイープの結果を保存しました: {output_csv}")
+
+    if plot_format is not None:
+        with _profile_stage(profiler, f"{name}/plot"):
+            _plot_sweep(os.path.join(base_path, f"{name}_graph.{plot_format}"), curves, *plot_labels,
+                        plot_format=plot_format)
+
+def process_sweep(base_path, chunk_size, diff_thresholds, plate_thicknesses=(), progress=None, cancel_event=None,
+                  profiler=None, plot_format="svg"):
+    """merged_data.csv を一度だけ読み込み、複数の diff_threshold・板厚の結果をまとめて出力する
+
+    diff_threshold ごとの き裂半幅と SIF（max_K のグラフと同じ値）を sweep_max_K.csv に、
+    板厚ごとの a/t・a/c を sweep_a_c_vs_a_t.csv に並べ、それぞれ重ね描きのグラフも作る。
+    ステップごとの並べ替えは全閾値で共有するので、閾値を増やしても二分探索の分しか増えない。
+    """
+    if not len(diff_thresholds) and not len(plate_thicknesses):
+        raise ValueError("diff_threshold か板厚の値を 1 つ以上指定してください。")
+    started = time.perf_counter()
+    values, offsets = _load_merged(base_path, chunk_size, profiler, "sweep/load")
+    if progress is not None:
+        progress(f"読み込み完了: {len(values)} 行, {len(offsets) - 1} ステップ ({time.perf_counter() - started:.2f} s)")
+
+    if len(diff_thresholds):
+        with _profile_stage(profiler, "sweep_max_K/index"):
+            index = _max_K_sweep_index(values[:, 2], values[:, 3], offsets)
+        curves = {}
+        for diff_threshold in diff_thresholds:
+            _check_cancel(cancel_event)
+            with _profile_stage(profiler, "sweep_max_K/select"):
+                selected = _select_max_K_rows_swept(index, diff_threshold)
+                curves[diff_threshold] = max_K_half_width(values[selected])
+            if progress is not None:
+                progress(f"diff_threshold = {diff_threshold:g}: {len(selected)} 行")
+        _save_sweep(base_path, "sweep_max_K", "diff_threshold,half_width,SIF", curves, profiler, plot_format,
+                    ("diff_threshold", "Crack half-width [mm]", "SIF [MPa*m^1/2]"))
+
+    if len(plate_thicknesses):
+        curves = {}
+        for plate_thickness in plate_thicknesses:
+            _check_cancel(cancel_event)
+            with _profile_stage(profiler, "sweep_a_c_vs_a_t/select"):
+                x, y = compute_a_c_vs_a_t(values[:, 2], values[:, 3], offsets, plate_thickness)
+            # 通常の a/c vs a/t と同じく最後のプロットを省く
+            curves[plate_thickness] = (x[:-1], y[:-1]) if len(x) > 1 else (x, y)
+        _save_sweep(base_path, "sweep_a_c_vs_a_t", "plate_thickness,a/t,a/c", curves, profiler, plot_format,
+                    ("t", "a/t", "a/c"))
+
+def _process_out_of_core(base_path, chunk_size, diff_threshold, plate_thickness, metrics,
+                         block_rows=DEFAULT_BLOCK_ROWS, progress=None, cancel_event=None, profiler=None,
+                         plot_format="svg"):
+    """merged_data をステップ単位のブロックで読みながら metrics の各指標を求めて出力する
+
+    1 回目の読み込みでは 3・4列目だけを読み、各ステップで選ばれた行番号を集める。
+    CSV に出力する全列は、選ばれた行だけを 2 回目の読み込みで取り出す。
+    """
+    input_file = os.path.join(base_path, "merged_data.csv")
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"{input_file} が存在しません。")
+    if _sidecar_is_fresh(input_file):
+        n_rows = np.load(_sidecar_path(input_file), mmap_mode="r").shape[0]
+    else:
+        n_rows = _count_csv_rows(input_file)
+    offsets = resolve_step_offsets(input_file, n_rows, chunk_size)
+
+    max_rows, min_rows, a_t, a_c = [], [], [], []
+    blocks = _iter_step_blocks(input_file, offsets, block_rows)
+    while True:
+        with _profile_stage(profiler, "out_of_core/read"):
+            block = next(blocks, None)
+        if block is None:
+            break
+        row_start, block_offsets, col2, col3 = block
+        _check_cancel(cancel_event)
+        if "max_K" in metrics:
+            with _profile_stage(profiler, "max_K/select"):
+                max_rows.append(_select_max_K_rows(col2, col3, block_offsets, diff_threshold) + row_start)
+        if "min_K" in metrics:
+            with _profile_stage(profiler, "min_K/select"):
+                min_rows.append(_select_min_K_rows(col3, block_offsets) + row_start)
+        if "a_c_vs_a_t" in metrics:
+            with _profile_stage(profiler, "a_c_vs_a_t/select"):
+                block_a_t, block_a_c = compute_a_c_vs_a_t(col2, col3, block_offsets, plate_thickness, row_start)
+            a_t.append(block_a_t)
+            a_c.append(block_a_c)
+        if progress is not None:
+            progress(f"{row_start + len(col2)}/{n_rows} 行を処理しました。")
+
+    if "max_K" in metrics:
+        with _profile_stage(profiler, "out_of_core/fetch"):
+            selected_rows = _fetch_rows(input_file, np.concatenate(max_rows or [[]]).astype(np.intp), block_rows)
+        _save_max_K(base_path, selected_rows, profiler, plot_format)
+    if "min_K" in metrics:
+        with _profile_stage(profiler, "out_of_core/fetch"):
+            selected_rows = _fetch_rows(input_file, np.concatenate(min_rows or [[]]).astype(np.intp), block_rows)
+        _save_min_K(base_path, selected_rows, plate_thickness, profiler, plot_format)
+    if "a_c_vs_a_t" in metrics:
+        _save_a_c_vs_a_t(base_path, np.concatenate(a_t or [[]]), np.concatenate(a_c or [[]]), profiler, plot_format)
+
+def process_max_K(base_path, chunk_size, diff_threshold, plate_thickness, out_of_core=False,
+                  block_rows=DEFAULT_BLOCK_ROWS, profiler=None, plot_format="svg", cache=None, progress=None,
+                  cancel_event=None):
+    """4列目の最大値処理とグラフ作成（out_of_core=True でブロック単位に読み込む）
+
+    plot_format は "svg"・"png"・"pdf" のいずれかで、None ならグラフを作らない。
+    cache（ResultCache）を渡すと、入力とパラメータが前回と同じ場合は保存済みの出力を使う。
+    progress・cancel_event の扱いは process_all と同じ。
+    """
+    process_all(base_path, chunk_size, diff_threshold, plate_thickness, progress, cancel_event,
+                out_of_core=out_of_core, block_rows=block_rows, profiler=profiler, plot_format=plot_format,
+                cache=cache, metrics=("max_K",))
+
+def process_min_K(base_path, chunk_size, plate_thickness, out_of_core=False, block_rows=DEFAULT_BLOCK_ROWS,
+                  profiler=None, plot_format="svg", cache=None, progress=None, cancel_event=None):
+    """4列目の最小値処理とグラフ作成（out_of_core 以降の引数は process_max_K と同じ）"""
+    process_all(base_path, chunk_size, None, plate_thickness, progress, cancel_event,
+                out_of_core=out_of_core, block_rows=block_rows, profiler=profiler, plot_format=plot_format,
+                cache=cache, metrics=("min_K",))
+
+def process_a_c_vs_a_t(base_path, chunk_size, plate_thickness, out_of_core=False, block_rows=DEFAULT_BLOCK_ROWS,
+                       profiler=None, plot_format="svg", cache=None, progress=None, cancel_event=None):
+    """
+    merged_data.csv に基づき a/c vs a/t グラフを作成。
+    各チャンク（ステップ）で 3列目の最大値から最小値を引いた値を分母に使用。
+    最後のプロットを除外し、グラフデータをCSVファイルとしても出力。
+    """
+    process_all(base_path, chunk_size, None, plate_thickness, progress, cancel_event,
+                out_of_core=out_of_core, block_rows=block_rows, profiler=profiler, plot_format=plot_format,
+                cache=cache, metrics=("a_c_vs_a_t",))
+
+def process_all(base_path, chunk_size, diff_threshold, plate_thickness, progress=None, cancel_event=None,
+                out_of_core=False, block_rows=DEFAULT_BLOCK_ROWS, profiler=None, plot_format="svg", cache=None,
+                metrics=("max_K", "min_K", "a_c_vs_a_t")):
+    """merged_data.csv を一度だけ読み込み、max_K・min_K・a/c vs a/t をまとめて出力する
+
+    progress・cancel_event の扱いは merge_files と同じ（各指標の出力の合間に確認する）。
+    out_of_core=True の場合はブロック単位の 1 回の読み込みで 3 指標をまとめて求める。
+    plot_format=None ならグラフを作らない（後から plot_results で作れる）。
+    cache を渡すとキャッシュから復元できた指標は計算せず、すべて復元できれば読み込みも省く。
+    """
+    metrics, keys = _restore_cached(cache, base_path, metrics, chunk_size, diff_threshold, plate_thickness,
+                                    plot_format, out_of_core)
+    if not metrics:
+        return
+
+    if out_of_core:
+        _process_out_of_core(base_path, chunk_size, diff_threshold, plate_thickness, metrics, block_rows,
+                             progress, cancel_event, profiler, plot_format)
+        _store_cached(cache, base_path, metrics, keys, plot_format)
+        return
+
+    started = time.perf_counter()
+    load_stage = f"{metrics[0]}/load" if len(metrics) == 1 else "load"
+    values, offsets = _load_merged(base_path, chunk_size, profiler, load_stage)
+    n_steps = len(offsets) - 1
+    if progress is not None:
+        progress(f"読み込み完了: {len(values)} 行, {n_steps} ステップ ({time.perf_counter() - started:.2f} s)")
+
+    stages = {
+        "max_K": ("max_K", lambda: _write_max_K(base_path, values, offsets, diff_threshold, profiler, plot_format)),
+        "min_K": ("min_K", lambda: _write_min_K(base_path, values, offsets, plate_thickness, profiler, plot_format)),
+        "a_c_vs_a_t": ("a/c vs a/t", lambda: _write_a_c_vs_a_t(base_path, values, offsets, plate_thickness,
+                                                              profiler, plot_format)),
+    }
+    for metric in metrics:
+        name, stage = stages[metric]
+        _check_cancel(cancel_event)
+        stage_started = time.perf_counter()
+        stage()
+        _store_cached(cache, base_path, [metric], keys, plot_format)
+        if progress is not None:
+            elapsed = max(time.perf_counter() - stage_started, 1e-9)
+            progress(f"{name}: {n_steps} ステップ処理 ({n_steps / elapsed:,.0f} ステップ/s)")
+
+def _snapshot_step_files(base_path):
+    """step*_-1sec フォルダ内の CSV の（パス, サイズ, 更新時刻）の一覧"""
+    snapshot = []
+    for file_path in _list_step_files(base_path, None):
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            continue
+        snapshot.append((file_path, stat.st_size, stat.st_mtime_ns))
+    return tuple(snapshot)
+
+def watch_once(base_path, chunk_size, diff_threshold, plate_thickness, state, workers=None,
+               progress=None, cancel_event=None, plot_format="svg"):
+    """監視 1 回分の処理。ステップファイルに変化があれば差分マージと全指標の出力を行う
+
+    state は呼び出し側が保持する dict（初回は空の dict）。書き込み途中のファイルを
+    読まないよう、直前のポーリングと同じ状態に落ち着いた時点で処理する。
+    処理を行った場合は True を返す。読み込めなかったステップファイルがあれば処理済みにせず、
+    次のポーリングでもう一度差分マージする。
+    """
+    snapshot = _snapshot_step_files(base_path)
+    settled = snapshot == state.get("seen")
+    state["seen"] = snapshot
+    if not snapshot or not settled or snapshot == state.get("processed"):
+        return False
+
+    merge_files(base_path, None, workers, incremental=True, progress=progress, cancel_event=cancel_event)
+    process_all(base_path, chunk_size, diff_threshold, plate_thickness, progress, cancel_event,
+                plot_format=plot_format)
+    manifest = _load_manifest(os.path.join(base_path, "merged_data.csv"))
+    if manifest is not None and len(manifest["entries"]) == len(snapshot):
+        state["processed"] = snapshot
+    return True
+
+def watch(base_path, chunk_size, diff_threshold, plate_thickness, interval=5.0, workers=None, stop_event=None,
+          plot_format="svg"):
+    """base_path を interval 秒ごとにポーリングし、新しいステップが届くたびに結果を更新する
+
+    OS 固有の通知 API は使わない。stop_event（threading.Event）のセットか Ctrl+C で終了する。
+    1 回分の処理で例外が起きても（書き込み中のファイルの入れ替えなど）内容を表示して監視を続け、
+    次のポーリングでやり直す。
+    """
+    stop_event = stop_event or threading.Event()
+    state = {}
+    print(f"監視を開始しました: {base_path}（{interval} 秒間隔）")
+    try:
+        while True:
+            try:
+                watch_once(base_path, chunk_size, diff_threshold, plate_thickness, state, workers,
+                           plot_format=plot_format)
+            except Exception as e:
+                print(f"エラー: {type(e).__name__}: {e}（次の確認でやり直します）")
+            if stop_event.wait(interval):
+                break
+    except KeyboardInterrupt:
+        pass
+    print("監視を終了しました。")
@@ -0,0 +1,123 @@
+"""グラフの出力（pyplot を使わず Agg キャンバスに描く）"""
+import os
+import numpy as np
+from .runtime import _profile_stage
+from .readers import read_numeric_csv
+from .selection import max_K_half_width
+# matplotlib は描画する時にだけ読み込む
+
+# グラフの出力形式（plot_format に指定できる値）
+PLOT_FORMATS = ("svg", "png", "pdf")
+
+def _new_figure():
+    """pyplot を介さずに Agg キャンバス付きの Figure を作る（画面・グローバル状態を使わない）"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=(8, 6))
+    FigureCanvasAgg(fig)
+    return fig
+
+def _save_figure(fig, output_path, plot_format):
+    """Figure を plot_format 形式で保存し、描画要素を破棄する"""
+    if plot_format not in PLOT_FORMATS:
+        raise ValueError(f"未対応のグラフ形式です: {plot_format}（{', '.join(PLOT_FORMATS)} のいずれか）")
+    try:
+        fig.tight_layout()
+        fig.savefig(output_path, format=plot_format)
+    finally:
+        fig.clf()
+
+def _plot_max_K(base_path, selected_rows, plot_format="svg"):
+    """max_K の行（2 行ずつの組）から き裂半幅と SIF のグラフを出力する"""
+    output_path = os.path.join(base_path, f"max_K_graph.{plot_format}")
+    x, y = max_K_half_width(selected_rows)
+
+    fig = _new_figure()
+    ax = fig.add_subplot()
+    ax.plot(x, y, marker='o', linestyle='-', color='blue')
+    ax.set_xlabel("Crack half-width [mm]", fontsize=12)
+    ax.set_ylabel("SIF [MPa*m^1/2]", fontsize=12)
+    ax.grid(True)
+    ax.set_xlim(left=0)
+    ax.set_ylim(bottom=0)
+    _save_figure(fig, output_path, plot_format)
+    print(f"グラフが{plot_format.upper()}形式で保存されました: {output_path}")
+
+def _plot_min_K(base_path, selected_rows, plate_thickness, plot_format="svg"):
+    """min_K の行から き裂深さと SIF のグラフを出力する（最後の行は除外）"""
+    output_path = os.path.join(base_path, f"min_K_graph.{plot_format}")
+
+    selected_rows = np.asarray(selected_rows)[:-1]
+    x = plate_thickness - selected_rows[:, 3]
+    y = selected_rows[:, 5]
+
+    fig = _new_figure()
+    ax = fig.add_subplot()
+    ax.plot(x, y, marker='o', linestyle='-', color='green')
+    ax.set_xlabel("Crack Depth [mm]", fontsize=12)
+    ax.set_ylabel("SIF [MPa*m^1/2]", fontsize=12)
+    ax.grid(True)
+    _save_figure(fig, output_path, plot_format)
+    print(f"グラフが{plot_format.upper()}形式で保存されました: {output_path}")
+
+def _plot_a_c_vs_a_t(base_path, x, y, plot_format="svg"):
+    """a/t・a/c の配列から a/c vs a/t グラフを出力する"""
+    output_path = os.path.join(base_path, f"a_c_vs_a_t_graph.{plot_format}")
+
+    fig = _new_figure()
+    ax = fig.add_subplot()
+    ax.plot(x, y, marker='o', linestyle='-', color='purple', label="a/c vs a/t")
+    ax.set_xlabel("a/t", fontsize=12)
+    ax.set_ylabel("a/c", fontsize=12)
+    ax.grid(True)
+    _save_figure(fig, output_path, plot_format)
+    print(f"a/c vs a/t グラフが保存されました: {output_path}")
+
+def plot_curves(output_path, curves, xlabel, ylabel, plot_format="svg", colors=None, legend_title=None,
+                markersize=None):
+    """凡例名ごとの曲線 {凡例名: (x, y)} を 1 枚のグラフに重ねて出力する（比較ツール・スイープ共通）
+
+    colors に {凡例名: 色} を渡すとその色で描き、含まれない凡例名は既定の色順（tab10）になる。
+    """
+    fig = _new_figure()
+    ax = fig.add_subplot()
+    for label, (x, y) in curves.items():
+        color = colors.get(label) if colors else None
+        ax.plot(x, y, marker='o', markersize=markersize, linestyle='-', color=color, label=label)
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    ax.grid(True)
+    ax.legend(title=legend_title, fontsize=10)
+    _save_figure(fig, output_path, plot_format)
+
+def _plot_sweep(output_path, curves, label, xlabel, ylabel, plot_format):
+    """スイープの各パラメータ値の曲線 {値: (x, y)} を 1 枚のグラフに重ねて出力する"""
+    curves = {f"{label} = {value:g}": xy for value, xy in curves.items()}
+    plot_curves(output_path, curves, xlabel, ylabel, plot_format, markersize=3)
+    print(f"スイープのグラフが保存されました: {output_path}")
+
+def plot_results(base_path, plate_thickness=None, plot_format="svg", profiler=None):
+    """出力済みの max_K.csv・min_K.csv・a_c_vs_a_t_data.csv からグラフだけを作り直す
+
+    数値の抽出をグラフなし（plot_format=None）で済ませた後に、必要な形式で描画する。
+    存在しない CSV は飛ばす。min_K のグラフには plate_thickness が必要。
+    """
+    max_k_csv = os.path.join(base_path, "max_K.csv")
+    min_k_csv = os.path.join(base_path, "min_K.csv")
+    a_c_csv = os.path.join(base_path, "a_c_vs_a_t_data.csv")
+    if not any(os.path.exists(path) for path in (max_k_csv, min_k_csv, a_c_csv)):
+        raise FileNotFoundError(f"グラフにする CSV が {base_path} にありません。")
+
+    if os.path.exists(max_k_csv):
+        with _profile_stage(profiler, "max_K/plot"):
+            _plot_max_K(base_path, read_numeric_csv(max_k_csv), plot_format)
+    if os.path.exists(min_k_csv):
+        if plate_thickness is None:
+            print("plate_thickness が指定されていないため min_K のグラフは作成しません。")
+        else:
+            with _profile_stage(profiler, "min_K/plot"):
+                _plot_min_K(base_path, read_numeric_csv(min_k_csv), plate_thickness, plot_format)
+    if os.path.exists(a_c_csv):
+        with _profile_stage(profiler, "a_c_vs_a_t/plot"):
+            a_c_data = read_numeric_csv(a_c_csv, skiprows=1)
+            _plot_a_c_vs_a_t(base_path, a_c_data[:, 0], a_c_data[:, 1], plot_format)
@@ -0,0 +1,319 @@
+"""ステップ CSV・マージ済みデータの読み込みと、マージ記録（ステップ表）の扱い"""
+import os
+import re
+import json
+import numpy as np
+# pandas・pyarrow は使う処理の中で読み込む（起動を軽くするため）
+
+def _list_step_files(base_path, max_number):
+    """step{i}_-1sec フォルダ内の CSV ファイルをステップ順に列挙する
+
+    max_number が None の場合は base_path 内に存在する step*_-1sec フォルダをすべて対象にする。
+    """
+    if max_number is None:
+        step_numbers = sorted(
+            int(match.group(1))
+            for match in (re.fullmatch(r"step(\d+)_-1sec", name) for name in os.listdir(base_path))
+            if match and os.path.isdir(os.path.join(base_path, match.group(0)))
+        )
+    else:
+        step_numbers = range(1, max_number + 1)
+
+    step_files = []
+    for i in step_numbers:
+        folder_name = f"step{i}_-1sec"
+        folder_path = os.path.join(base_path, folder_name)
+        if not os.path.exists(folder_path):
+            print(f"フォルダが見つかりません: {folder_path}")
+            continue
+
+        for file_name in os.listdir(folder_path):
+            if file_name.endswith(".csv"):
+                step_files.append(os.path.join(folder_path, file_name))
+    return step_files
+
+def _step_number(file_path):
+    """ステップファイルのパスから step{i}_-1sec の番号 i を取り出す"""
+    folder_name = os.path.basename(os.path.dirname(file_path))
+    return int(re.fullmatch(r"step(\d+)_-1sec", folder_name).group(1))
+
+# ステップごとの CSV 出力の先頭にあるヘッダ行数
+STEP_HEADER_ROWS = 2
+
+def _default_csv_engine():
+    """pyarrow があれば pyarrow、無ければ NumPy のパーサを使う"""
+    try:
+        import pyarrow.csv  # noqa: F401
+    except ImportError:
+        return "numpy"
+    return "pyarrow"
+
+def read_numeric_csv(file_path, skiprows=0, usecols=None, engine=None):
+    """数値だけの CSV を float64 の 2次元配列として読み込む
+
+    先頭 skiprows 行を読み飛ばし、usecols を指定した場合はその列だけを（指定順に）解析する。
+    engine は "pyarrow"・"numpy"（np.loadtxt）のどちらか（None なら使えるほう）。
+    数値に変換できない値があれば ValueError を送出する。
+    """
+    if engine is None:
+        engine = _default_csv_engine()
+    if engine == "numpy":
+        return np.loadtxt(file_path, delimiter=",", skiprows=skiprows, usecols=usecols, dtype=np.float64, ndmin=2)
+    if engine != "pyarrow":
+        raise ValueError(f"未対応の engine です: {engine}")
+
+    import pyarrow as pa
+    table = _read_arrow_table(file_path, skiprows, usecols)
+    return np.column_stack([_arrow_column_to_float64(column, pa) for column in table.columns])
+
+def _read_arrow_table(file_path, skiprows=0, usecols=None):
+    """pyarrow で CSV を読み込む（usecols を指定した列は float64、それ以外は型を推定する）"""
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    read_options = pa_csv.ReadOptions(skip_rows=skiprows, autogenerate_column_names=True)
+    if usecols is None:
+        convert_options = pa_csv.ConvertOptions()
+    else:
+        names = [f"f{i}" for i in usecols]
+        convert_options = pa_csv.ConvertOptions(include_columns=names,
+                                                column_types={name: pa.float64() for name in names})
+    return pa_csv.read_csv(file_path, read_options=read_options, convert_options=convert_options)
+
+def _arrow_column_to_float64(column, pa):
+    """pyarrow の列を float64 の配列にする（null は NaN）
+
+    to_numpy は pandas を読み込むので、null の無いチャンクはバッファから直接取り出す。
+    """
+    parts = []
+    for chunk in column.cast(pa.float64()).chunks:
+        if chunk.null_count:
+            parts.append(chunk.to_numpy(zero_copy_only=False))
+        else:
+            parts.append(np.frombuffer(chunk.buffers()[1], dtype=np.float64, count=len(chunk), offset=chunk.offset * 8))
+    return np.concatenate(parts) if parts else np.empty(0)
+
+def _format_csv_text(values, integer_columns=()):
+    """float の 2次元配列を CSV テキストにする（pandas の to_csv と同じ書式で、NaN は空欄）
+
+    integer_columns の列は整数で書く（pandas が整数列と推定する列が "1.0" ではなく "1" になるように）。
+    """
+    columns = [values[:, j].astype(np.int64).tolist() if j in integer_columns else values[:, j].tolist()
+               for j in range(values.shape[1])]
+    return "".join(",".join("" if x != x else repr(x) for x in row) + "\n" for row in zip(*columns))
+
+def _read_step_file(file_path):
+    """ステップの CSV を読み込み、マージ用の CSV テキスト・float 配列・行数を返す（ワーカー内で実行）
+
+    CSV テキストは pandas で読み込んで to_csv した場合と同じ書式（欠損の無い整数だけの列は整数）。
+    pyarrow が無い場合、または数値に変換できない列を含む場合は pandas で型を推定して読み込み、
+    後者では配列は None になる。
+    """
+    if _default_csv_engine() == "pyarrow":
+        import pyarrow as pa
+        table = _read_arrow_table(file_path, skiprows=STEP_HEADER_ROWS)
+        try:
+            values = np.column_stack([_arrow_column_to_float64(column, pa) for column in table.columns])
+        except ValueError:
+            pass
+        else:
+            integer_columns = {j for j, column in enumerate(table.columns)
+                               if pa.types.is_integer(column.type) and column.null_count == 0}
+            return _format_csv_text(values, integer_columns), values, len(values)
+
+    import pandas as pd
+    df = pd.read_csv(file_path, skiprows=STEP_HEADER_ROWS, header=None, float_precision="round_trip")
+    numeric = all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes)
+    return df.to_csv(index=False, header=False), df.to_numpy(dtype=float) if numeric else None, len(df)
+
+# .npy サイドカーのヘッダ長（行数を後から書き換えられるよう固定長にしておく）
+_NPY_HEADER_SIZE = 128
+
+def _sidecar_path(csv_path):
+    """CSV に対応するバイナリサイドカー（.npy）のパス"""
+    return os.path.splitext(csv_path)[0] + ".npy"
+
+def _write_npy_header(f, n_rows, n_cols):
+    """float64・行優先の .npy ヘッダを固定長でファイル先頭に書き込む"""
+    header = repr({"descr": "<f8", "fortran_order": False, "shape": (n_rows, n_cols)})
+    header_len = _NPY_HEADER_SIZE - 10
+    f.seek(0)
+    f.write(b"\x93NUMPY\x01\x00" + header_len.to_bytes(2, "little"))
+    f.write(header.ljust(header_len - 1).encode("latin1") + b"\n")
+
+def _sidecar_is_fresh(csv_path):
+    """CSV と同じかより新しい .npy サイドカーがあるか"""
+    sidecar = _sidecar_path(csv_path)
+    return os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(csv_path)
+
+def read_merged_data(csv_path, usecols=None):
+    """マージ済み CSV を float の 2次元配列として読み込む
+
+    CSV より新しい .npy サイドカーがあればメモリマップで開き、テキストの解析を省く。
+    usecols を指定した場合はその列だけを返す。
+    """
+    if _sidecar_is_fresh(csv_path):
+        mapped = np.load(_sidecar_path(csv_path), mmap_mode="r")
+        return mapped if usecols is None else np.asarray(mapped[:, usecols])
+    return read_numeric_csv(csv_path, usecols=usecols)
+
+def _manifest_path(csv_path):
+    """マージ済みファイルの記録（どのステップファイルをどこまで書いたか）のパス"""
+    return os.path.splitext(csv_path)[0] + ".manifest.json"
+
+def _load_manifest(output_file):
+    """前回のマージ記録を読み込む。CSV・サイドカーの実体と食い違う場合は None を返す"""
+    manifest_file = _manifest_path(output_file)
+    if not (os.path.exists(manifest_file) and os.path.exists(output_file)):
+        return None
+    try:
+        with open(manifest_file, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    entries = manifest["entries"]
+    csv_end = entries[-1]["csv_end"] if entries else 0
+    if os.path.getsize(output_file) != csv_end:
+        return None
+    if manifest["sidecar"]:
+        sidecar_file = _sidecar_path(output_file)
+        n_rows = entries[-1]["rows_end"] if entries else 0
+        expected_size = _NPY_HEADER_SIZE + n_rows * (manifest["n_cols"] or 0) * 8
+        if not os.path.exists(sidecar_file) or os.path.getsize(sidecar_file) != expected_size:
+            manifest["sidecar"] = False
+    return manifest
+
+def _build_step_table(entries):
+    """マージ記録からステップ番号と各ステップの開始行（末尾に総行数）の表を作る
+
+    同じステップフォルダの複数ファイルは 1 ステップにまとめ、行の無いステップは除く。
+    """
+    numbers = []
+    offsets = [0]
+    previous_end = 0
+    for entry in entries:
+        rows = entry["rows_end"] - previous_end
+        previous_end = entry["rows_end"]
+        if rows == 0:
+            continue
+        step = _step_number(entry["path"])
+        if numbers and numbers[-1] == step:
+            offsets[-1] = entry["rows_end"]
+        else:
+            numbers.append(step)
+            offsets.append(entry["rows_end"])
+    return {"numbers": numbers, "offsets": offsets}
+
+def load_step_index(csv_path):
+    """マージ時に記録したステップ表を (ステップ番号の配列, 開始行の配列) として返す
+
+    開始行の配列は末尾に総行数を含むので、ステップ k の行は offsets[k]:offsets[k + 1] になる。
+    記録が無い、または CSV と食い違う場合は None を返す。
+    """
+    manifest = _load_manifest(csv_path)
+    if manifest is None or "steps" not in manifest:
+        return None
+    steps = manifest["steps"]
+    return np.asarray(steps["numbers"], dtype=np.int64), np.asarray(steps["offsets"], dtype=np.intp)
+
+def _save_manifest(output_file, manifest):
+    """マージ記録をステップ表と合わせて書き出す"""
+    manifest = dict(manifest, steps=_build_step_table(manifest["entries"]))
+    manifest_file = _manifest_path(output_file)
+    with open(manifest_file + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(manifest_file + ".tmp", manifest_file)
+
+def _chunk_offsets(n_rows, chunk_size):
+    """chunk_size 行ごとに区切ったステップの開始行番号（末尾に n_rows を付加）"""
+    return np.append(np.arange(0, n_rows, chunk_size), n_rows)
+
+def resolve_step_offsets(csv_path, n_rows, chunk_size=None):
+    """K 抽出で使うステップの区切り（開始行番号、末尾に n_rows）を返す
+
+    chunk_size が指定されていれば従来どおり固定行数で区切る。None または 0 の場合は
+    マージ時のステップ表を使うので、ステップごとに節点数が異なっても正しく区切れる。
+    """
+    if chunk_size:
+        return _chunk_offsets(n_rows, chunk_size)
+    step_index = load_step_index(csv_path)
+    if step_index is None:
+        raise ValueError(f"ステップ表が見つかりません: {_manifest_path(csv_path)}\n"
+                         "chunk_size を指定するか、merge をやり直してください。")
+    offsets = step_index[1]
+    if offsets[-1] != n_rows:
+        raise ValueError(f"ステップ表の行数 ({offsets[-1]}) と {csv_path} の行数 ({n_rows}) が一致しません。")
+    return offsets
+
+# 省メモリモードで一度に読み込む行数の目安
+DEFAULT_BLOCK_ROWS = 1_000_000
+
+def _count_csv_rows(csv_path):
+    """CSV の行数を改行の数から数える（中身は解析しない）"""
+    rows = 0
+    last_byte = b"\n"
+    with open(csv_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 24), b""):
+            rows += block.count(b"\n")
+            last_byte = block[-1:]
+    return rows if last_byte == b"\n" else rows + 1
+
+def _iter_step_blocks(csv_path, offsets, block_rows):
+    """merged_data の 3・4列目を、ステップ境界で区切った block_rows 行程度のブロックごとに返す
+
+    (ブロック先頭の行番号, ブロック内のステップ区切り, 3列目, 4列目) を順に返す。
+    CSV からは 3・4列目だけを block_rows 行ずつ読むので、メモリ使用量はファイルサイズによらない。
+    数値は read_numeric_csv と同じく正しく丸めて変換する（float_precision="round_trip"）ので、
+    サイドカーが無くても全体を読み込む場合と同じ値になる。
+    """
+    if _sidecar_is_fresh(csv_path):
+        mapped = np.load(_sidecar_path(csv_path), mmap_mode="r")
+
+        def take(start, stop):
+            return np.array(mapped[start:stop, 2]), np.array(mapped[start:stop, 3])
+    else:
+        import pandas as pd
+        reader = iter(pd.read_csv(csv_path, header=None, usecols=[2, 3], dtype=float, chunksize=block_rows,
+                                  float_precision="round_trip"))
+        buffered = np.empty((0, 2))
+
+        def take(start, stop):
+            nonlocal buffered
+            while len(buffered) < stop - start:
+                chunk = next(reader, None)
+                if chunk is None:
+                    break
+                buffered = np.concatenate((buffered, chunk.to_numpy()))
+            block, buffered = buffered[:stop - start], buffered[stop - start:]
+            return block[:, 0], block[:, 1]
+
+    n_steps = len(offsets) - 1
+    step = 0
+    while step < n_steps:
+        # block_rows に収まるところまでステップをまとめる（1 ステップが大きければ単独で）
+        end_step = np.searchsorted(offsets, offsets[step] + block_rows, side="right") - 1
+        end_step = min(max(end_step, step + 1), n_steps)
+        start, stop = offsets[step], offsets[end_step]
+        col2, col3 = take(start, stop)
+        yield start, offsets[step:end_step + 1] - start, col2, col3
+        step = end_step
+
+def _fetch_rows(csv_path, rows, block_rows):
+    """merged_data から指定した行番号の行（全列）を rows の順に取り出す（数値の変換は _iter_step_blocks と同じ）"""
+    unique_rows, inverse = np.unique(rows, return_inverse=True)
+    if _sidecar_is_fresh(csv_path):
+        mapped = np.load(_sidecar_path(csv_path), mmap_mode="r")
+        return np.asarray(mapped[unique_rows])[inverse]
+
+    import pandas as pd
+    parts = []
+    start = 0
+    for chunk in pd.read_csv(csv_path, header=None, chunksize=block_rows, float_precision="round_trip"):
+        stop = start + len(chunk)
+        lo, hi = np.searchsorted(unique_rows, [start, stop])
+        if hi > lo:
+            parts.append(chunk.to_numpy(dtype=float)[unique_rows[lo:hi] - start])
+        start = stop
+    if not parts:
+        return np.empty((0, 0))
+    return np.concatenate(parts)[inverse]
@@ -0,0 +1,76 @@
+"""処理の中断（Cancelled）と段階ごとの時間・メモリの計測（StageProfiler）"""
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+class Cancelled(Exception):
+    """cancel_event がセットされて処理を中断したことを表す"""
+
+def _check_cancel(cancel_event):
+    """cancel_event がセットされていれば Cancelled を送出する"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise Cancelled("処理を中断しました。")
+
+def _peak_rss_mb():
+    """プロセスのピーク RSS（MB）。取得できない環境では None"""
+    try:
+        import resource
+    except ImportError:
+        # Windows では psutil があればピークのワーキングセットを使う
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+class StageProfiler:
+    """処理の段階ごとに経過時間・CPU 時間・ピーク RSS を記録する
+
+    同じ名前の段階を何度通った場合は時間を合計する。ピーク RSS はプロセス全体の
+    最大値なので、その段階を終えた時点までの最大値として読む。
+    CPU 時間はプロセス全体の値なので、並列読み込み中のワーカーの分も含む。
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        try:
+            yield
+        finally:
+            record = self.stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": None})
+            record["calls"] += 1
+            record["wall_s"] += time.perf_counter() - started
+            record["cpu_s"] += time.process_time() - cpu_started
+            record["peak_rss_mb"] = _peak_rss_mb()
+
+    def summary(self):
+        """計測結果を表形式の文字列で返す"""
+        lines = [f"{'stage':24s} {'calls':>5s} {'wall s':>9s} {'cpu s':>9s} {'peak RSS MB':>12s}"]
+        for name, record in self.stages.items():
+            peak = "-" if record["peak_rss_mb"] is None else f"{record['peak_rss_mb']:.1f}"
+            lines.append(f"{name:24s} {record['calls']:5d} {record['wall_s']:9.3f} {record['cpu_s']:9.3f} {peak:>12s}")
+        return "\n".join(lines)
+
+    def save(self, json_path):
+        """計測結果を JSON で書き出す"""
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"stages": self.stages}, f, ensure_ascii=False, indent=2)
+
+def _profile_stage(profiler, name):
+    """profiler があればその段階を計測し、無ければ何もしないコンテキストを返す"""
+    return nullcontext() if profiler is None else profiler.stage(name)
+
+def report_profile(profiler, base_path, mode):
+    """計測結果の表を表示し、base_path/profile_{mode}.json に保存する"""
+    json_path = os.path.join(base_path, f"profile_{mode}.json")
+    print(profiler.summary())
+    profiler.save(json_path)
+    print(f"プロファイル結果を保存しました: {json_path}")
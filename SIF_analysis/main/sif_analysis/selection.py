@@ -0,0 +1,110 @@
+"""ステップごとの max_K・min_K の行の選択と a/t・a/c、き裂半幅の計算（NumPy のみ）"""
+import numpy as np
+
+def _select_max_K_rows(col2, col3, offsets, diff_threshold):
+    """各ステップの 4列目最大行と、3列目がそこから diff_threshold 以上離れた最初の行を選ぶ
+
+    col2・col3 は 3・4列目の配列、offsets はステップの開始行番号の配列。戻り値は行番号で、
+    ステップ順に「最大行, 2番目の行」の順に並ぶ（2番目が無いステップは最大行のみ）。
+    """
+    sizes = np.diff(offsets)
+    n_steps = len(sizes)
+    step_ids = np.repeat(np.arange(n_steps), sizes)
+
+    # ステップごとに 4列目の降順へ並べる（同値は元の行順、NaN は末尾）
+    order = np.lexsort((-col3, step_ids))
+    max_rows = order[offsets[:-1]]
+
+    # 並べた順で最大行との 3列目の差が閾値以上になる最初の行を探す
+    max_col2 = np.repeat(col2[max_rows], sizes)
+    hits = np.flatnonzero(np.abs(col2[order] - max_col2) >= diff_threshold)
+    second_steps, first_hit = np.unique(step_ids[hits], return_index=True)
+    second_rows = order[hits[first_hit]]
+    return _interleave_max_K_rows(max_rows, second_steps, second_rows)
+
+def _interleave_max_K_rows(max_rows, second_steps, second_rows):
+    """ステップごとの最大行と 2番目の行（second_steps のステップのみ）を「最大行, 2番目の行」の順に並べる"""
+    n_steps = len(max_rows)
+    has_second = np.zeros(n_steps, dtype=bool)
+    has_second[second_steps] = True
+    max_pos = np.arange(n_steps) + np.concatenate(([0], np.cumsum(has_second)[:-1]))
+    selected = np.empty(n_steps + len(second_steps), dtype=np.intp)
+    selected[max_pos] = max_rows
+    selected[max_pos[second_steps] + 1] = second_rows
+    return selected
+
+def _max_K_sweep_index(col2, col3, offsets):
+    """diff_threshold を変えて何度も max_K の行を選ぶための前計算（_select_max_K_rows_swept に渡す）
+
+    ステップごとの並べ替えは 1 回だけ行い、並べた順での最大行との 3列目の差を順位（整数）に
+    置き換えてステップ内の累積最大を取っておく。閾値ごとの処理は二分探索だけで済む。
+    """
+    sizes = np.diff(offsets)
+    n_steps = len(sizes)
+    step_ids = np.repeat(np.arange(n_steps), sizes)
+    order = np.lexsort((-col3, step_ids))
+    max_rows = order[offsets[:-1]]
+
+    # 差が NaN の行はどの閾値でも選ばれないので -inf として扱う
+    dist = np.abs(col2[order] - np.repeat(col2[max_rows], sizes))
+    dist[np.isnan(dist)] = -np.inf
+    levels, ranks = np.unique(dist, return_inverse=True)
+
+    # ステップ番号 × 順位の種類数を足すと、ステップをまたいでも単調な累積最大になる
+    stride = len(levels)
+    prefix_max = np.maximum.accumulate(ranks.ravel() + step_ids * stride)
+    return {"order": order, "offsets": offsets, "max_rows": max_rows, "levels": levels,
+            "prefix_max": prefix_max, "step_base": np.arange(n_steps) * stride}
+
+def _select_max_K_rows_swept(index, diff_threshold):
+    """_max_K_sweep_index の前計算から、_select_max_K_rows と同じ行番号を求める"""
+    levels = index["levels"]
+    level = np.searchsorted(levels, diff_threshold, side="left")
+    if level == len(levels):
+        return _interleave_max_K_rows(index["max_rows"], np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp))
+
+    # 累積最大が閾値の順位に達する最初の位置（ステップ内に無ければ次のステップの先頭になる）
+    hits = np.searchsorted(index["prefix_max"], index["step_base"] + level, side="left")
+    second_steps = np.flatnonzero(hits < index["offsets"][1:])
+    second_rows = index["order"][hits[second_steps]]
+    return _interleave_max_K_rows(index["max_rows"], second_steps, second_rows)
+
+def _select_min_K_rows(col3, offsets):
+    """各ステップで 4列目が最小の行番号を返す（同値は元の行順、NaN は末尾）"""
+    step_ids = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    order = np.lexsort((col3, step_ids))
+    return order[offsets[:-1]]
+
+def compute_a_c_vs_a_t(col2, col3, offsets, plate_thickness, row_start=0):
+    """各ステップの a/t と a/c を計算する（3列目の幅が 0 のステップは除外）
+
+    col2・col3 は 3・4列目の配列、offsets はステップの開始行番号（末尾に行数）の配列。
+    row_start は col2・col3 の先頭が merged_data の何行目かで、メッセージの表示にだけ使う。
+    """
+    starts = offsets[:-1]
+    max_col3 = np.fmax.reduceat(col2, starts)
+    min_col3 = np.fmin.reduceat(col2, starts)
+    min_col4 = np.fmin.reduceat(col3, starts)
+
+    flat = max_col3 == min_col3
+    for i in np.flatnonzero(flat):
+        print(f"チャンク内で 3列目の最大値と最小値が同じためスキップ: "
+              f"{row_start + offsets[i]}-{row_start + offsets[i + 1]}")
+
+    depth = plate_thickness - min_col4[~flat]
+    diff_half = (max_col3[~flat] - min_col3[~flat]) / 2
+    return depth / plate_thickness, depth / diff_half
+
+def max_K_half_width(selected_rows):
+    """max_K の行（2 行ずつの組）から き裂半幅と、3列目が小さい側の SIF を求める
+
+    最後の 2 行と、組にならない端数の行は除外する。戻り値は (半幅の配列, SIF の配列)。
+    """
+    max_k_data = np.asarray(selected_rows, dtype=np.float64)[:-2]
+    n_pairs = len(max_k_data) // 2
+    pairs = max_k_data[:2 * n_pairs].reshape(n_pairs, 2, max_k_data.shape[1])
+    row1 = pairs[:, 0]
+    row2 = pairs[:, 1]
+    x = np.abs(row1[:, 2] - row2[:, 2]) / 2
+    y = np.where(row1[:, 2] < row2[:, 2], row1[:, 5], row2[:, 5])
+    return x, y
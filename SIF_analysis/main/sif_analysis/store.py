@@ -0,0 +1,66 @@
+"""比較ツール用の試験体データのバイナリストア（列ごとに連続した配列をメモリマップで開く）"""
+import os
+import json
+import numpy as np
+from .readers import read_merged_data
+
+SPECIMEN_STORE_DIR_NAME = ".sif_store"
+
+class SpecimenStore:
+    """比較ツール用に、試験体ごとの CSV（min_K-*・max_K-*・merged_data-*）をバイナリで保持する
+
+    CSV 1 つにつき store_dir/<CSV名>.npy を 1 つ作り、列ごとに連続した float64 配列
+    （形状は (列数, 行数)）として保存する。2 回目以降は CSV のサイズと更新時刻が記録と
+    同じならメモリマップで開くだけなので、テキストの解析は CSV が変わった時にしか行わない。
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self._index_path = os.path.join(store_dir, "index.json")
+        self._opened = {}
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        with open(self._index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+        os.replace(self._index_path + ".tmp", self._index_path)
+
+    def load(self, csv_path):
+        """csv_path の数値を (行数, 列数) の配列で返す（values[:, j] は連続したメモリ上の列）"""
+        stat = os.stat(csv_path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        name = os.path.basename(csv_path)
+        opened = self._opened.get(name)
+        if opened is not None and opened[0] == signature:
+            return opened[1]
+
+        store_path = os.path.join(self.store_dir, os.path.splitext(name)[0] + ".npy")
+        index = self._load_index()
+        if index.get(name) != signature or not os.path.exists(store_path):
+            values = read_merged_data(csv_path)
+            os.makedirs(self.store_dir, exist_ok=True)
+            with open(store_path + ".tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(np.asarray(values, dtype=np.float64).T))
+            os.replace(store_path + ".tmp", store_path)
+            index[name] = signature
+            self._save_index(index)
+
+        values = np.load(store_path, mmap_mode="r").T
+        self._opened[name] = (signature, values)
+        return values
+
+# フォルダごとの SpecimenStore（同じプロセス内の比較ツールで共有する）
+_specimen_stores = {}
+
+def specimen_store(csv_folder):
+    """csv_folder の試験体データを保持する SpecimenStore（csv_folder/.sif_store）を返す"""
+    store_dir = os.path.join(os.path.abspath(csv_folder), SPECIMEN_STORE_DIR_NAME)
+    if store_dir not in _specimen_stores:
+        _specimen_stores[store_dir] = SpecimenStore(store_dir)
+    return _specimen_stores[store_dir]
@@ -1,12 +1,447 @@
 import cv2
 import numpy as np
-import csv
 import os
-import matplotlib.pyplot as plt
+import glob
+import time
+import base64
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import filedialog
 from tkinter import ttk
 
+# 解析パラメータの初期値（GUI・一括解析の CLI で共通）
+DEFAULT_PARAMS = {
+    "sharp_strength": 8.3,
+    "clip_limit": 3.0,
+    "binary_threshold": 121,
+    "kernel_width": 3,
+    "kernel_height": 4,
+    "scale_bar_length_pixels": 167,
+    "circularity_threshold": 0.74,
+}
+
+# プレビューの表示サイズの上限 [px] と、パラメータ変更から更新までの待ち時間 [ms]
+PREVIEW_MAX_SIZE = 800
+PREVIEW_DELAY_MS = 150
+
+# フォルダを指定した一括解析で対象にする画像の拡張子
+IMAGE_EXTENSIONS = (".tif", ".tiff", ".png", ".jpg", ".jpeg", ".bmp")
+
+# タイル分割解析の既定の重なり幅 [px]（最大の粒子の直径より大きくする）
+DEFAULT_TILE_OVERLAP = 64
+
+# タイル分割解析で出力する result_with_circles.jpg の長辺の上限 [px]（これより大きい画像は縮小して描く）
+TILED_OVERLAY_MAX_SIZE = 8000
+
+# 画像全体の解析で CLAHE が使うタイル数（縦横）
+CLAHE_GRID = (8, 8)
+
+# measure_particles の戻り値の列（座標・長さは px）
+MEASUREMENT_COLUMNS = ("x", "y", "radius", "area", "perimeter", "circularity",
+                       "centroid_x", "centroid_y", "equivalent_radius")
+
+# 出力する粒子の表の列（NPZ・Parquet の列名, CSV の見出し）
+PARTICLE_COLUMNS = (
+    ("id", "ID"),
+    ("radius_um", "Radius (μm)"),
+    ("equivalent_radius_um", "Equivalent radius (μm)"),
+    ("centroid_x_px", "Centroid x (px)"),
+    ("centroid_y_px", "Centroid y (px)"),
+    ("area_um2", "Area (μm^2)"),
+    ("perimeter_um", "Perimeter (μm)"),
+    ("circularity", "Circularity"),
+)
+
+def measure_particles(binary):
+    """二値画像の粒子（連結成分）ごとに外形の輪郭を求め、外接円・面積・周長・円形度などを測る
+
+    画像全体に 1 回だけ findContours（RETR_CCOMP）を掛け、最上位の輪郭（連結成分の外形。
+    穴の中の粒子も含む）を connectedComponentsWithStats のラベルに対応付ける。OpenCV に
+    まとめて測る関数がない外接円・面積・周長だけを輪郭ごとに求め、円形度・重心・
+    円相当半径（連結成分の画素数と同じ面積の円の半径）は全粒子の配列でまとめて計算する。
+    戻り値は列が MEASUREMENT_COLUMNS の順の float64 配列（粒子数, 9）で、ラベル順に並ぶ。
+    """
+    _, labels, stats, centroids = cv2.connectedComponentsWithStats(binary)
+    contours, hierarchy = cv2.findContours(binary, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+    outer = [contour for contour, (_, _, _, parent) in zip(contours, hierarchy[0] if contours else ()) if parent < 0]
+
+    measurements = np.empty((len(outer), len(MEASUREMENT_COLUMNS)))
+    particle_labels = np.empty(len(outer), dtype=np.int64)
+    for i, contour in enumerate(outer):
+        (x, y), radius = cv2.minEnclosingCircle(contour)
+        measurements[i, :5] = x, y, radius, cv2.contourArea(contour), cv2.arcLength(contour, True)
+        x0, y0 = contour[0, 0]
+        particle_labels[i] = labels[y0, x0]
+    order = np.argsort(particle_labels, kind="stable")
+    measurements, particle_labels = measurements[order], particle_labels[order]
+
+    area, perimeter = measurements[:, 3], measurements[:, 4]
+    circularity = np.zeros(len(measurements))
+    np.divide(area, perimeter ** 2, out=circularity, where=perimeter > 0)
+    measurements[:, 5] = 4 * np.pi * circularity
+    measurements[:, 6:8] = centroids[particle_labels]
+    measurements[:, 8] = np.sqrt(stats[particle_labels, cv2.CC_STAT_AREA] / np.pi)
+    return measurements
+
+def _sharpen(img, params):
+    # コントラスト調整（シャープ化）
+    kernel = np.array([[-1, -1, -1], [-1, params["sharp_strength"], -1], [-1, -1, -1]])
+    return cv2.filter2D(img, -1, kernel)
+
+def _apply_clahe(sharp, params):
+    # CLAHE（ローカルコントラスト強調）
+    # タイル分割解析では、画像全体の場合と同じくらいの大きさのタイルになるよう clahe_grid が渡される
+    clahe = cv2.createCLAHE(clipLimit=params["clip_limit"], tileGridSize=params.get("clahe_grid", CLAHE_GRID))
+    return clahe.apply(sharp)
+
+def _blur(clahe_img, params):
+    # 軽いガウシアンブラーを追加
+    return cv2.GaussianBlur(clahe_img, (3, 5), 0)
+
+def _binarize(blurred_clahe, params):
+    # 二値化のしきい値を調整
+    _, binary = cv2.threshold(blurred_clahe, params["binary_threshold"], 255, cv2.THRESH_BINARY)
+    return binary
+
+def _remove_noise(binary, params):
+    # モルフォロジー処理によるノイズ除去
+    kernel = np.ones((params["kernel_width"], params["kernel_height"]), np.uint8)
+    return cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel, iterations=2)
+
+def _measure(cleaned_binary, params):
+    # ラベリングと粒子ごとの輪郭・外接円・円形度（列は MEASUREMENT_COLUMNS の順）
+    return measure_particles(cleaned_binary)
+
+# 解析の段階（名前, 処理, その段階から計算し直しが必要になるパラメータ）。前の段階の出力を入力にする
+PIPELINE_STAGES = (
+    ("sharp", _sharpen, ("sharp_strength",)),
+    ("clahe", _apply_clahe, ("clip_limit",)),
+    ("blurred", _blur, ()),
+    ("binary", _binarize, ("binary_threshold",)),
+    ("cleaned", _remove_noise, ("kernel_width", "kernel_height")),
+    ("measurements", _measure, ()),
+)
+
+class ParticlePipeline:
+    """画像 1 枚分の解析の各段階の出力を保持し、変わったパラメータの段階以降だけを計算し直す
+
+    scale_bar_length_pixels・circularity_threshold はどの段階にも影響しないので、
+    これらだけを変えた場合は保持している測定値を select_particles で選び直すだけで済む。
+    """
+
+    def __init__(self, image_path):
+        self.image_path = image_path
+        self.image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        self.stages = {}
+        self.params = {}
+        self._downscaled = {}
+
+    def downscaled(self, scale):
+        """scale 倍に縮小した入力画像（scale ごとに 1 回だけ縮小して保持する）"""
+        if scale >= 1.0:
+            return self.image
+        if scale not in self._downscaled:
+            self._downscaled[scale] = cv2.resize(self.image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return self._downscaled[scale]
+
+    def run(self, params):
+        """params で各段階を計算し（保持している段階は再利用）、粒子の測定値の配列を返す"""
+        for i, (name, _, keys) in enumerate(PIPELINE_STAGES):
+            if any(self.params.get(key) != params[key] for key in keys):
+                for later, _, _ in PIPELINE_STAGES[i:]:
+                    self.stages.pop(later, None)
+                break
+        self.params = dict(params)
+
+        previous = self.image
+        for name, stage, _ in PIPELINE_STAGES:
+            if name not in self.stages:
+                self.stages[name] = stage(previous, params)
+            previous = self.stages[name]
+        return previous
+
+def _tile_bounds(height, width, tile_size, overlap):
+    """(コア領域, 重なりを付けた処理範囲) を (x0, y0, x1, y1) で左上から行ごとに返す"""
+    for top in range(0, height, tile_size):
+        for left in range(0, width, tile_size):
+            core = (left, top, min(left + tile_size, width), min(top + tile_size, height))
+            padded = (max(core[0] - overlap, 0), max(core[1] - overlap, 0),
+                      min(core[2] + overlap, width), min(core[3] + overlap, height))
+            yield core, padded
+
+def _measure_tile(tile, params):
+    """1 タイル分の全段階（ワーカープロセス内で実行）。座標はタイル内のもの"""
+    result = tile
+    for _, stage, _ in PIPELINE_STAGES:
+        result = stage(result, params)
+    return result
+
+def measure_particles_tiled(image, params, tile_size, overlap=DEFAULT_TILE_OVERLAP, workers=None):
+    """画像を tile_size 四方のタイルに分け、周囲に overlap の重なりを付けて 1 枚ずつ解析する
+
+    各段階の中間画像はタイルの大きさでしか作らないので、巨大な画像でもメモリは
+    （タイルの面積）×（同時に処理するタイル数）程度に収まる。workers > 1（既定は CPU 数）なら
+    タイルをプロセスプールで並列に処理し、送り出すタイルは workers の 2 倍までに抑える。
+    タイル境界をまたぐ粒子は重なり部分で丸ごと測られ、外接円の中心がコア領域にあるタイルの
+    測定値だけを残すので 1 回だけ数えられる（overlap が粒子の直径より小さいと欠けて測られる）。
+    CLAHE はタイルごとに掛かるため、画像全体を解析した場合と境界付近の二値化が少し異なることがある。
+    戻り値は measure_particles と同じ列の配列（座標は画像全体のもの、タイル順）。
+    """
+    height, width = image.shape[:2]
+    n_workers = workers or os.cpu_count() or 1
+    measurements = []
+
+    def collect(core, padded, tile_measurements):
+        tile_measurements[:, [0, 6]] += padded[0]
+        tile_measurements[:, [1, 7]] += padded[1]
+        x, y = tile_measurements[:, 0], tile_measurements[:, 1]
+        own = (core[0] <= x) & (x < core[2]) & (core[1] <= y) & (y < core[3])
+        measurements.append(tile_measurements[own])
+
+    def tile_job(padded):
+        x0, y0, x1, y1 = padded
+        # 画像全体の CLAHE と同じくらいの大きさのタイルになるよう、タイル数を処理範囲に合わせる
+        clahe_grid = (max(1, round((x1 - x0) * CLAHE_GRID[0] / width)),
+                      max(1, round((y1 - y0) * CLAHE_GRID[1] / height)))
+        return np.ascontiguousarray(image[y0:y1, x0:x1]), dict(params, clahe_grid=clahe_grid)
+
+    if n_workers == 1:
+        for core, padded in _tile_bounds(height, width, tile_size, overlap):
+            collect(core, padded, _measure_tile(*tile_job(padded)))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            pending = deque()
+            for core, padded in _tile_bounds(height, width, tile_size, overlap):
+                pending.append((core, padded, executor.submit(_measure_tile, *tile_job(padded))))
+                if len(pending) >= 2 * n_workers:
+                    core_done, padded_done, future = pending.popleft()
+                    collect(core_done, padded_done, future.result())
+            while pending:
+                core_done, padded_done, future = pending.popleft()
+                collect(core_done, padded_done, future.result())
+    return np.concatenate(measurements) if measurements else np.empty((0, len(MEASUREMENT_COLUMNS)))
+
+def select_particles(measurements, circularity_threshold):
+    """円形度が circularity_threshold 以上 1.0 以下の粒子を表す bool 配列"""
+    circularity = measurements[:, 5]
+    return (circularity_threshold <= circularity) & (circularity <= 1.0)
+
+def draw_particles(image, measurements, scale=1.0):
+    """グレースケール画像に粒子の外接円を緑で描いたカラー画像を返す
+
+    image は元の画像を scale 倍に縮小したもの（ParticlePipeline.downscaled）で、
+    中心・半径も同じ比率で縮めて描くので、カラー画像は縮小後の大きさでしか作らない。
+    """
+    if scale < 1.0:
+        measurements = measurements[:, :3] * scale
+    colored_img = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    for x, y, radius in measurements[:, :3].astype(np.int64).tolist():
+        cv2.circle(colored_img, (x, y), radius, (0, 255, 0), 2)
+    return colored_img
+
+def particle_table(measurements, microns_per_pixel):
+    """測定値の配列から PARTICLE_COLUMNS の列の表（列名 → 1次元配列の dict）を作る"""
+    return {
+        "id": np.arange(1, len(measurements) + 1),
+        "radius_um": measurements[:, 2] * microns_per_pixel,
+        "equivalent_radius_um": measurements[:, 8] * microns_per_pixel,
+        "centroid_x_px": measurements[:, 6],
+        "centroid_y_px": measurements[:, 7],
+        "area_um2": measurements[:, 3] * microns_per_pixel ** 2,
+        "perimeter_um": measurements[:, 4] * microns_per_pixel,
+        "circularity": measurements[:, 5],
+    }
+
+def write_particle_table(table, path_stem):
+    """粒子の表を path_stem.csv・path_stem.npz（pyarrow があれば path_stem.parquet も）にまとめて書き出す
+
+    table は列名 → 1次元配列の dict（PARTICLE_COLUMNS の列、一括解析では先頭に image 列が付く）。
+    CSV の見出しは PARTICLE_COLUMNS の見出し（image 列は "Image"）。CSV は以前の csv.writer と同じく
+    既定の文字コード（日本語版 Windows では cp932）・改行 CRLF で書き、実数は repr と同じ桁数（往復で値が変わらない最短の表記）にする。
+    """
+    headers = dict(PARTICLE_COLUMNS, image="Image")
+    formats = ["%s" if name == "image" else "%d" if name == "id" else "%r" for name in table]
+    columns = list(table.values())
+    rows = np.empty((len(columns[0]), len(columns)), dtype=object)
+    for i, column in enumerate(columns):
+        # Python の float にしてから入れる（np.float64 の repr は "np.float64(...)" になるため）
+        rows[:, i] = column.tolist()
+    with open(path_stem + ".csv", "w", newline="") as csvfile:
+        np.savetxt(csvfile, rows, fmt=formats, delimiter=",", newline="\r\n",
+                   header=",".join(headers[name] for name in table), comments="")
+    np.savez(path_stem + ".npz", **table)
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return
+    pyarrow.parquet.write_table(pyarrow.table(table), path_stem + ".parquet")
+
+def _new_figure():
+    """pyplot を介さずに Agg キャンバス付きの Figure を作る（ワーカープロセスで画面を使わない）"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig
+
+def analyze_image(image_path, params, output_dir, show_plot=False, tile_size=None,
+                  tile_overlap=DEFAULT_TILE_OVERLAP, tile_workers=None, overlay_max_size=TILED_OVERLAY_MAX_SIZE):
+    """1 枚の画像を解析し、output_dir に particle_data.csv・radius_distribution.png・result_with_circles.jpg を書き出す
+
+    params は DEFAULT_PARAMS と同じキーの dict。show_plot=True なら分布図を画面にも表示する。
+    particle_data は円形度の条件を満たした粒子の PARTICLE_COLUMNS の表（particle_data.npz、
+    pyarrow があれば particle_data.parquet にも同じ表を書く）。
+    tile_size を指定すると measure_particles_tiled でタイルに分けて（tile_workers 個のプロセスで）解析する。
+    その場合 result_with_circles.jpg は長辺が overlay_max_size 以下になるよう縮小して描く（0 なら原寸）。
+    画像全体の大きさで残るのは読み込んだグレースケール画像（1 画素 1 バイト）だけになる。
+    戻り値は particle_data と同じ表（列名 → 配列の dict。画像を読めなければ None）。
+    """
+    # 保存先ディレクトリを作成
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 画像の読み込み
+    pipeline = ParticlePipeline(image_path)
+    if pipeline.image is None:
+        print(f"画像の読み込みに失敗しました: {image_path}")
+        return None
+
+    # シャープ化・CLAHE・ブラー・二値化・ノイズ除去・粒子ごとの測定
+    if tile_size:
+        measurements = measure_particles_tiled(pipeline.image, params, tile_size, tile_overlap, tile_workers)
+    else:
+        measurements = pipeline.run(params)
+
+    # スケールバーからピクセルあたりのスケールを計算
+    microns_per_pixel = 1 / params["scale_bar_length_pixels"]
+
+    # 粒子解析
+    valid = measurements[select_particles(measurements, params["circularity_threshold"])]
+    overlay_scale = 1.0
+    if tile_size and overlay_max_size:
+        overlay_scale = min(1.0, overlay_max_size / max(pipeline.image.shape[:2]))
+    colored_img = draw_particles(pipeline.downscaled(overlay_scale), valid, overlay_scale)
+    table = particle_table(valid, microns_per_pixel)
+    write_particle_table(table, os.path.join(output_dir, "particle_data"))
+
+    # 平均半径を計算
+    radii = table["radius_um"]
+    if len(radii):
+        average_radius = np.mean(radii)
+        print(f"平均半径 (μm): {average_radius:.2f}")
+
+        # 粒子半径の分布をプロット（画面に出す場合だけ pyplot を使う）
+        if show_plot:
+            import matplotlib.pyplot as plt
+            fig = plt.figure()
+        else:
+            fig = _new_figure()
+        ax = fig.add_subplot()
+        ax.hist(radii, bins=20, range=(0, radii.max()), weights=np.ones(len(radii)) / len(radii) * 100, edgecolor="black")
+        ax.set_xlabel("Radius (μm)")
+        ax.set_ylabel("Frequency (%)")
+        ax.set_title("Radius Distribution")
+        ax.grid(True)
+        fig.savefig(os.path.join(output_dir, "radius_distribution.png"))
+        if show_plot:
+            plt.show()
+    else:
+        print("粒子が検出されませんでした。")
+
+    # 結果を保存
+    cv2.imwrite(os.path.join(output_dir, "result_with_circles.jpg"), colored_img)
+    return table
+
+def expand_image_paths(patterns):
+    """フォルダ・glob パターンを展開し、画像ファイルのパスを重複なく返す"""
+    image_paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(os.path.join(pattern, name) for name in os.listdir(pattern))
+        else:
+            matches = sorted(glob.glob(pattern))
+        for path in matches:
+            path = os.path.abspath(path)
+            if path not in image_paths and os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS):
+                image_paths.append(path)
+    return image_paths
+
+def _image_output_dirs(image_paths, output_root):
+    """画像ごとの出力フォルダ（output_root/<画像名>、同じ名前があれば _2, _3 … を付ける）"""
+    output_dirs = []
+    used = set()
+    for image_path in image_paths:
+        stem = os.path.splitext(os.path.basename(image_path))[0]
+        name = stem
+        n = 1
+        while name in used:
+            n += 1
+            name = f"{stem}_{n}"
+        used.add(name)
+        output_dirs.append(os.path.join(output_root, name))
+    return output_dirs
+
+def _analyze_for_batch(image_path, params, output_dir, tile_size=None, tile_overlap=DEFAULT_TILE_OVERLAP,
+                       tile_workers=1, overlay_max_size=TILED_OVERLAY_MAX_SIZE):
+    """一括解析の 1 枚分（ワーカープロセス内で実行する場合、タイルは順に処理する）"""
+    try:
+        particles = analyze_image(image_path, params, output_dir, tile_size=tile_size, tile_overlap=tile_overlap,
+                                  tile_workers=tile_workers, overlay_max_size=overlay_max_size)
+        return {"image": image_path, "particles": particles}
+    except Exception as e:
+        return {"image": image_path, "particles": None, "error": f"{type(e).__name__}: {e}"}
+
+def run_batch(patterns, params, output_root, workers=None, tile_size=None, tile_overlap=DEFAULT_TILE_OVERLAP,
+              overlay_max_size=TILED_OVERLAY_MAX_SIZE):
+    """複数の画像をプロセスプールで並列に解析し、全画像の粒子の表を output_root/all_particles.csv・.npz にまとめる
+
+    画像ごとの結果は output_root/<画像名>/ に単体の解析と同じファイル名で書き出す。
+    tile_size を指定すると各画像をタイルに分けて解析する。画像が 1 枚ならタイルを workers 個の
+    プロセスで並列に処理し、複数枚なら並列化は画像単位のままにする。
+    まとめた表は先頭に image 列（画像ごとの出力フォルダ名）が付く以外は particle_data と同じ列。
+    戻り値は画像ごとの結果（image・particles、失敗した場合は error）のリスト（入力順）。
+    """
+    image_paths = expand_image_paths(patterns)
+    if not image_paths:
+        print("解析対象の画像が見つかりませんでした。")
+        return []
+    output_dirs = _image_output_dirs(image_paths, output_root)
+    os.makedirs(output_root, exist_ok=True)
+
+    results = {}
+    def report(result):
+        results[result["image"]] = result
+        status = "失敗" if result["particles"] is None else f"{len(result['particles']['id'])} 粒子"
+        print(f"[{len(results)}/{len(image_paths)}] {status}: {result['image']}")
+
+    if tile_size and len(image_paths) == 1:
+        report(_analyze_for_batch(image_paths[0], params, output_dirs[0], tile_size, tile_overlap, workers,
+                                  overlay_max_size))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_analyze_for_batch, image_path, params, output_dir, tile_size, tile_overlap, 1,
+                                       overlay_max_size)
+                       for image_path, output_dir in zip(image_paths, output_dirs)]
+            for future in as_completed(futures):
+                report(future.result())
+    results = [results[image_path] for image_path in image_paths]
+
+    # 全画像の粒子を 1 つの表にまとめる
+    tables = [(os.path.basename(output_dir), result["particles"])
+              for result, output_dir in zip(results, output_dirs) if result["particles"] is not None]
+    if not tables:
+        tables = [("", particle_table(np.empty((0, len(MEASUREMENT_COLUMNS))), 1.0))]
+    combined = {"image": np.concatenate([np.full(len(table["id"]), name) for name, table in tables])}
+    for name, _ in PARTICLE_COLUMNS:
+        combined[name] = np.concatenate([table[name] for _, table in tables])
+    write_particle_table(combined, os.path.join(output_root, "all_particles"))
+    failed = sum(result["particles"] is None for result in results)
+    print(f"{len(results) - failed} 枚を解析しました（失敗 {failed} 枚）。全粒子の表: {os.path.join(output_root, 'all_particles.csv')}")
+    return results
+
 # GUIアプリケーションを作成
 class ParticleAnalyzerApp:
     def __init__(self, root):
@@ -15,15 +450,20 @@ class ParticleAnalyzerApp:
 
         # 初期パラメータ
         self.params = {
-            "sharp_strength": tk.DoubleVar(value=8.3),
-            "clip_limit": tk.DoubleVar(value=3.0),
-            "binary_threshold": tk.IntVar(value=121),
-            "kernel_width": tk.IntVar(value=3),
-            "kernel_height": tk.IntVar(value=4),
-            "scale_bar_length_pixels": tk.IntVar(value=167),
-            "circularity_threshold": tk.DoubleVar(value=0.74)
+            name: (tk.DoubleVar if isinstance(value, float) else tk.IntVar)(value=value)
+            for name, value in DEFAULT_PARAMS.items()
         }
 
+        # プレビュー（パラメータを変えると変わった段階以降だけを計算し直して表示する）
+        self.pipeline = None
+        self.preview_window = None
+        self.preview_job = None
+        for var in self.params.values():
+            var.trace_add("write", self.schedule_preview)
+
+        # タイル分割解析のタイルの大きさ [px]（0 なら画像全体を一度に解析する。プレビューは常に画像全体）
+        self.tile_size = tk.IntVar(value=0)
+
         # GUIウィジェットの作成
         self.create_widgets()
 
@@ -43,112 +483,129 @@ class ParticleAnalyzerApp:
             ttk.Label(frame, text=param).grid(row=idx + row_offset, column=0, sticky=tk.W)
             ttk.Entry(frame, textvariable=var).grid(row=idx + row_offset, column=1, sticky=(tk.W, tk.E))
 
+        ttk.Label(frame, text="tile_size (0=分割しない)").grid(row=len(self.params) + row_offset, column=0, sticky=tk.W)
+        ttk.Entry(frame, textvariable=self.tile_size).grid(row=len(self.params) + row_offset, column=1, sticky=(tk.W, tk.E))
+        row_offset += 1
+
         # 実行ボタン
         ttk.Button(frame, text="解析を開始", command=self.run_analysis).grid(row=len(self.params) + row_offset, column=0, columnspan=3)
+        ttk.Button(frame, text="フォルダを一括解析", command=self.run_batch_analysis).grid(row=len(self.params) + row_offset + 1, column=0, columnspan=3)
+        ttk.Button(frame, text="プレビュー", command=self.open_preview).grid(row=len(self.params) + row_offset + 2, column=0, columnspan=3)
 
     def select_file(self):
         file_path = filedialog.askopenfilename(title="画像ファイルを選択")
         if file_path:
             self.image_path.set(file_path)
 
+    def get_params(self):
+        return {name: var.get() for name, var in self.params.items()}
+
     def run_analysis(self):
         image_path = self.image_path.get()
         if not image_path:
             print("画像ファイルを選択してください。")
             return
 
-        # パラメータを取得
-        sharp_strength = self.params["sharp_strength"].get()
-        clip_limit = self.params["clip_limit"].get()
-        binary_threshold = self.params["binary_threshold"].get()
-        kernel_width = self.params["kernel_width"].get()
-        kernel_height = self.params["kernel_height"].get()
-        scale_bar_length_pixels = self.params["scale_bar_length_pixels"].get()
-        circularity_threshold = self.params["circularity_threshold"].get()
-
         # 保存先ディレクトリを定義
         output_dir = "./output"
-        os.makedirs(output_dir, exist_ok=True)
+        if analyze_image(image_path, self.get_params(), output_dir, show_plot=True,
+                         tile_size=self.tile_size.get()) is not None:
+            print("解析が完了しました。結果はoutputフォルダに保存されました。")
 
-        # 画像の読み込み
-        img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-        if img is None:
-            print("画像の読み込みに失敗しました。")
+    def run_batch_analysis(self):
+        folder_path = filedialog.askdirectory(title="画像フォルダを選択")
+        if not folder_path:
+            return
+        # 画像ごとの結果は <フォルダ>/output/<画像名>/ に保存（画面が固まらないよう別スレッドで実行）
+        output_root = os.path.join(folder_path, "output")
+        threading.Thread(target=run_batch, args=([folder_path], self.get_params(), output_root),
+                         kwargs={"tile_size": self.tile_size.get()}, daemon=True).start()
+        print(f"一括解析を開始しました: {folder_path}")
+
+    def open_preview(self):
+        if not self.image_path.get():
+            print("画像ファイルを選択してください。")
+            return
+        if self.preview_window is None or not self.preview_window.winfo_exists():
+            self.preview_window = tk.Toplevel(self.root)
+            self.preview_window.title("プレビュー")
+            # 表示する段階（result は円形度で選んだ粒子の外接円）
+            self.preview_stage = tk.StringVar(value="result")
+            stage_names = ["result", "image"] + [name for name, _, _ in PIPELINE_STAGES[:-1]]
+            ttk.OptionMenu(self.preview_window, self.preview_stage, "result", *stage_names,
+                           command=lambda _: self.update_preview()).grid(row=0, column=0, sticky=tk.W)
+            self.preview_status = ttk.Label(self.preview_window, text="")
+            self.preview_status.grid(row=0, column=1, sticky=tk.W)
+            self.preview_label = ttk.Label(self.preview_window)
+            self.preview_label.grid(row=1, column=0, columnspan=2)
+        self.update_preview()
+
+    def schedule_preview(self, *args):
+        # 入力中に何度も計算しないよう、最後の変更から少し待って更新する
+        if self.preview_window is None or not self.preview_window.winfo_exists():
+            return
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+        self.preview_job = self.root.after(PREVIEW_DELAY_MS, self.update_preview)
+
+    def update_preview(self):
+        self.preview_job = None
+        try:
+            params = self.get_params()
+        except (tk.TclError, ValueError):
+            return  # 入力途中の値は無視する
+        image_path = self.image_path.get()
+        if self.pipeline is None or self.pipeline.image_path != image_path:
+            self.pipeline = ParticlePipeline(image_path)
+        if self.pipeline.image is None:
+            self.preview_status.config(text="画像の読み込みに失敗しました。")
             return
 
-        # コントラスト調整（シャープ化）
-        kernel = np.array([[-1, -1, -1], [-1, sharp_strength, -1], [-1, -1, -1]])
-        sharp = cv2.filter2D(img, -1, kernel)
-
-        # CLAHE（ローカルコントラスト強調）
-        clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(8, 8))
-        clahe_img = clahe.apply(sharp)
-
-        # 軽いガウシアンブラーを追加
-        blurred_clahe = cv2.GaussianBlur(clahe_img, (3, 5), 0)
-
-        # 二値化のしきい値を調整
-        _, binary = cv2.threshold(blurred_clahe, binary_threshold, 255, cv2.THRESH_BINARY)
-
-        # モルフォロジー処理によるノイズ除去
-        kernel = np.ones((kernel_width, kernel_height), np.uint8)
-        cleaned_binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel, iterations=2)
-
-        # スケールバーからピクセルあたりのスケールを計算
-        microns_per_pixel = 1 / scale_bar_length_pixels
-
-        # ラベリング（ラベルを付ける）
-        num_labels, labels = cv2.connectedComponents(cleaned_binary)
-
-        # 粒子解析
-        colored_img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
-        valid_particle_count = 0
-        radius_list = []
-        with open(os.path.join(output_dir, "particle_data.csv"), "w", newline="") as csvfile:
-            csvwriter = csv.writer(csvfile)
-            csvwriter.writerow(["ID", "Radius (μm)"])
-            for label in range(1, num_labels):
-                mask = np.uint8(labels == label)
-                contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                for contour in contours:
-                    if len(contour) > 0:
-                        (x, y), radius = cv2.minEnclosingCircle(contour)
-                        area = cv2.contourArea(contour)
-                        perimeter = cv2.arcLength(contour, True)
-                        circularity = 4 * np.pi * (area / (perimeter ** 2)) if perimeter > 0 else 0
-                        if circularity_threshold <= circularity <= 1.0:
-                            valid_particle_count += 1
-                            radius_in_microns = radius * microns_per_pixel
-                            radius_list.append(radius_in_microns)
-                            csvwriter.writerow([valid_particle_count, radius_in_microns])
-                            center = (int(x), int(y))
-                            cv2.circle(colored_img, center, int(radius), (0, 255, 0), 2)
-
-        # 平均半径を計算
-        if radius_list:
-            average_radius = np.mean(radius_list)
-            print(f"平均半径 (μm): {average_radius:.2f}")
-
-            # 粒子半径の分布をプロット
-            plt.hist(radius_list, bins=20, range=(0, max(radius_list)), weights=np.ones(len(radius_list)) / len(radius_list) * 100, edgecolor="black")
-            plt.xlabel("Radius (μm)")
-            plt.ylabel("Frequency (%)")
-            plt.title("Radius Distribution")
-            plt.grid(True)
-            plt.savefig(os.path.join(output_dir, "radius_distribution.png"))
-            plt.show()
+        started = time.perf_counter()
+        try:
+            measurements = self.pipeline.run(params)
+        except cv2.error as e:
+            self.preview_status.config(text=f"パラメータが不正です: {e.err}")
+            return
+        valid = measurements[select_particles(measurements, params["circularity_threshold"])]
+
+        # 表示用の大きさで描き（縮小した入力画像は保持しておく）、PNG にして Tk の PhotoImage で表示する
+        scale = min(1.0, PREVIEW_MAX_SIZE / max(self.pipeline.image.shape[:2]))
+        stage = self.preview_stage.get()
+        if stage == "result":
+            preview = draw_particles(self.pipeline.downscaled(scale), valid, scale)
+        elif stage == "image":
+            preview = self.pipeline.downscaled(scale)
         else:
-            print("粒子が検出されませんでした。")
-
-        # 結果を保存
-        cv2.imwrite(os.path.join(output_dir, "result_with_circles.jpg"), colored_img)
-        print("解析が完了しました。結果はoutputフォルダに保存されました。")
-
-# GUIアプリケーションの起動
+            preview = self.pipeline.stages[stage]
+            if scale < 1.0:
+                preview = cv2.resize(preview, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        self.preview_photo = tk.PhotoImage(data=base64.b64encode(cv2.imencode(".png", preview)[1]).decode("ascii"))
+        self.preview_label.config(image=self.preview_photo)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        mean_radius = valid[:, 2].mean() / params["scale_bar_length_pixels"] if len(valid) else 0.0
+        self.preview_status.config(text=f"{len(valid)} 粒子, 平均半径 {mean_radius:.3f} μm ({elapsed_ms:.0f} ms)")
+
+# GUIアプリケーションの起動（画像を指定した場合は画面を出さずに一括解析）
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = ParticleAnalyzerApp(root)
-    root.mainloop()
+    parser = argparse.ArgumentParser(description="Particle size analysis. Without images the GUI is started.")
+    parser.add_argument("images", nargs="*", help="Image files, folders or glob patterns to analyse in batch")
+    parser.add_argument("--output", default="./output", help="Output folder (one subfolder per image plus all_particles.csv)")
+    parser.add_argument("--workers", type=int, required=False, help="Number of images (or tiles of a single image) analysed in parallel (default: CPU count)")
+    parser.add_argument("--tile_size", type=int, required=False, help="Analyse each image in tiles of this size in pixels to bound memory on large mosaics")
+    parser.add_argument("--tile_overlap", type=int, default=DEFAULT_TILE_OVERLAP, help="Overlap between tiles in pixels; must exceed the largest particle diameter")
+    parser.add_argument("--overlay_max_size", type=int, default=TILED_OVERLAY_MAX_SIZE, help="Longest side of result_with_circles.jpg in tiled runs; larger images are drawn downscaled (0: full size)")
+    for name, value in DEFAULT_PARAMS.items():
+        parser.add_argument(f"--{name}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    if args.images:
+        run_batch(args.images, {name: getattr(args, name) for name in DEFAULT_PARAMS}, args.output, args.workers,
+                  args.tile_size, args.tile_overlap, args.overlay_max_size)
+    else:
+        root = tk.Tk()
+        app = ParticleAnalyzerApp(root)
+        root.mainloop()
 
 
 